@@ -1,4 +1,25 @@
+import array
+import bisect
+import collections
 import datetime
+import functools
+import heapq
+import itertools
+import statistics
+
+
+DATE_CACHE_SIZE = 65536
+
+
+@functools.lru_cache(maxsize=DATE_CACHE_SIZE)
+def parse_date(text):
+    # Shared by loaders, datasets reuse few distinct dates so equal strings also share one date object.
+    return datetime.date.fromisoformat(text)
+
+
+@functools.lru_cache(maxsize=DATE_CACHE_SIZE)
+def format_date(date):
+    return str(date)
 
 
 def try_argument(arg, type_value):
@@ -6,110 +27,660 @@ def try_argument(arg, type_value):
         raise RuntimeError("Arguments doesn't match data type requirements.")
 
 
-class Shelter:
+def check_animal_arguments(name, year_of_birth, gender, date_of_entry, species, breed):
+    if type(name) != str or type(year_of_birth) != int or type(gender) != str or \
+            not isinstance(date_of_entry, datetime.date) or type(species) != str or type(breed) != str:
+        raise RuntimeError("Arguments doesn't match data type requirements.")
+
+
+def check_foster_arguments(name, address, phone_number, max_animals):
+    if type(name) != str or type(address) != str or type(phone_number) != str or type(max_animals) != int:
+        raise RuntimeError("Arguments doesn't match data type requirements.")
+
+
+def record_to_row(record, fields, required):
+    # Bulk records are tuples in argument order or dicts keyed by argument names.
+    if isinstance(record, dict):
+        if any(field not in record for field in required):
+            raise RuntimeError("Invalid record structure.")
+        return tuple(record.get(field) for field in fields)
+    if not isinstance(record, (tuple, list)) or not len(required) <= len(record) <= len(fields):
+        raise RuntimeError("Invalid record structure.")
+    return tuple(record)
+
+
+MAX_ORDINAL = datetime.date.max.toordinal()
+
+RESIDENCY_LEVELS = MAX_ORDINAL.bit_length() + 1
+
+# Packed keys hold an ordinal in the high bits and a small number (animal order, record count) in the low bits.
+KEY_BITS = 32
+
+KEY_MASK = (1 << KEY_BITS) - 1
+
+# Unfiltered list_animals sorts the residents only when they are fewer than 1 / RESIDENTS_SORT_SHARE of the shelter,
+# otherwise it keeps the animals of Shelter.animals found among them.
+RESIDENTS_SORT_SHARE = 16
+
+ANIMAL_FIELDS = ("name", "year_of_birth", "gender", "date_of_entry", "species", "breed")
+
+FOSTER_FIELDS = ("name", "address", "phone_number", "max_animals", "sql_id")
+
+STATISTICS = ("length_of_stay", "adoption_rate", "foster_episode_duration", "exams_per_animal")
+
+PLACEMENT_POLICIES = ("least_loaded", "fill_first", "round_robin")
+
+OCCUPANCY_STATES = ("in_shelter", "in_foster", "adopted")
+
+INDEXED_ATTRIBUTES = (("name", str), ("year_of_birth", int), ("gender", str), ("date_of_entry", datetime.date),
+                      ("species", str), ("breed", str))
+
+
+def shelter_order(animal):
+    return animal.name, animal.order
+
+
+class _AttributeIndex:
+    # Buckets of animals with same attribute value, each bucket is kept in the order of Shelter.animals.
+    def __init__(self, attribute):
+        self.attribute = attribute
+        self.buckets = {}
+        self.unsorted = set()
+
+    def add(self, animal):
+        value = getattr(animal, self.attribute)
+        bucket = self.buckets.get(value)
+        if bucket is None:
+            self.buckets[value] = [animal]
+            return
+        if shelter_order(bucket[-1]) > shelter_order(animal):
+            self.unsorted.add(value)
+        bucket.append(animal)
+
+    def get(self, value):
+        bucket = self.buckets.get(value)
+        if bucket is None:
+            return []
+        if value in self.unsorted:
+            bucket.sort(key=shelter_order)
+            self.unsorted.discard(value)
+        return bucket
+
+
+class _IntervalNode:
+    # Intervals crossing the middle of one block of days. Their starts and ends are kept as sorted packed keys,
+    # each parallel to a list of animals, so a day inside the block takes a prefix of starts or a suffix of ends.
+    __slots__ = ("starts", "start_animals", "ends", "end_animals")
+
+    def __init__(self):
+        self.starts = array.array("q")
+        self.start_animals = []
+        self.ends = array.array("q")
+        self.end_animals = []
+
+    def add(self, start_key, end_key, animal):
+        position = bisect.bisect_left(self.starts, start_key)
+        self.starts.insert(position, start_key)
+        self.start_animals.insert(position, animal)
+        position = bisect.bisect_left(self.ends, end_key)
+        self.ends.insert(position, end_key)
+        self.end_animals.insert(position, animal)
+
+    def remove(self, start_key, end_key):
+        position = bisect.bisect_left(self.starts, start_key)
+        del self.starts[position], self.start_animals[position]
+        position = bisect.bisect_left(self.ends, end_key)
+        del self.ends[position], self.end_animals[position]
+
+
+class _ResidencyIndex:
+    # In-shelter periods of all animals in an interval tree over the whole range of ordinals. A period is stored
+    # in the smallest aligned block of 2 ** level days containing it, so a day is covered only by the periods of
+    # its own block on every level and the tree never has to be rebalanced. Keys are ordinal << KEY_BITS | order
+    # of the animal, periods of one animal never overlap, so every key is unique.
     def __init__(self):
+        self.levels = [{} for _ in range(RESIDENCY_LEVELS)]
+
+    def replace(self, animal, removed, added):
+        for start, end in removed:
+            level = (start ^ end).bit_length()
+            nodes = self.levels[level]
+            node = nodes[start >> level]
+            node.remove(start << KEY_BITS | animal.order, end << KEY_BITS | animal.order)
+            if not node.starts:
+                del nodes[start >> level]
+        for start, end in added:
+            level = (start ^ end).bit_length()
+            node = self.levels[level].get(start >> level)
+            if node is None:
+                node = self.levels[level][start >> level] = _IntervalNode()
+            node.add(start << KEY_BITS | animal.order, end << KEY_BITS | animal.order, animal)
+
+    def residents(self, date):
+        # Animals in the shelter on the date, in no particular order.
+        point = date.toordinal()
+        found = []
+        for level, nodes in enumerate(self.levels):
+            node = nodes.get(point >> level)
+            if node is None:
+                continue
+            if point < (point >> level << level) | (1 << level >> 1):
+                found.extend(node.start_animals[:bisect.bisect_right(node.starts, point << KEY_BITS | KEY_MASK)])
+            else:
+                found.extend(node.end_animals[bisect.bisect_left(node.ends, point << KEY_BITS):])
+        return found
+
+
+class _ExamIndex:
+    # Every exam once, as parallel lists of records, animals and dates ordered by date (stable for same dates),
+    # and for every vet the positions of its exams in these lists. Exams added out of order are sorted lazily.
+    def __init__(self):
+        self.records = []
         self.animals = []
+        self.dates = []
+        self.by_vet = {}
+        self.sorted = True
+
+    def add(self, animal, record):
+        if self.sorted and self.dates and self.dates[-1] > record.date:
+            self.sorted = False
+        if self.sorted:
+            self._add_position(record.vet, len(self.records))
+        self.records.append(record)
+        self.animals.append(animal)
+        self.dates.append(record.date)
+
+    def _add_position(self, vet, position):
+        positions = self.by_vet.get(vet)
+        if positions is None:
+            positions = self.by_vet[vet] = array.array("q")
+        positions.append(position)
+
+    def _reorder(self, positions):
+        self.records = [self.records[position] for position in positions]
+        self.animals = [self.animals[position] for position in positions]
+        self.dates = [self.dates[position] for position in positions]
+        self.by_vet = {}
+        for position, record in enumerate(self.records):
+            self._add_position(record.vet, position)
+
+    def remove_animal(self, animal):
+        self._reorder([position for position, other in enumerate(self.animals) if other is not animal])
+
+    def _bisect_positions(self, positions, date, right):
+        # Like bisect on the dates of the exams at the positions, those are ordered as well.
+        low = 0
+        high = len(positions)
+        while low < high:
+            middle = (low + high) // 2
+            middle_date = self.dates[positions[middle]]
+            if middle_date < date or (right and middle_date == date):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def iter_range(self, start, end, vet=None):
+        if not self.sorted:
+            self._reorder(sorted(range(len(self.dates)), key=self.dates.__getitem__))
+            self.sorted = True
+        records = self.records
+        animals = self.animals
+        if vet is None:
+            low = bisect.bisect_left(self.dates, start) if start is not None else 0
+            high = bisect.bisect_right(self.dates, end) if end is not None else len(self.dates)
+            positions = range(low, high)
+        else:
+            positions = self.by_vet.get(vet, ())
+            low = self._bisect_positions(positions, start, False) if start is not None else 0
+            high = self._bisect_positions(positions, end, True) if end is not None else len(positions)
+            positions = positions[low:high]
+        for position in positions:
+            yield animals[position], records[position]
+
+
+class Shelter:
+    def __init__(self):
+        self._animals = []
+        self._animals_sorted = True
+        self._animal_index = {}
+        self._attribute_indexes = {attribute: _AttributeIndex(attribute) for attribute, _ in INDEXED_ATTRIBUTES}
+        self._residency = _ResidencyIndex()
+        self._exams = _ExamIndex()
+        self._foster_index = {}
+        self._fosters_by_sql_id = {}
+        self._animals_by_sql_id = {}
         self.fosters = []
+        self.version = 0
+        self.cache_maxsize = 256
+        self._cache = collections.OrderedDict()
+        self._cache_version = 0
+        self._cache_hits = 0
+        self._cache_misses = 0
+
+    def mark_changed(self):
+        self.version += 1
+
+    def _cached(self, key, compute):
+        # Results are valid until the next mutation, least recently used entries are evicted first.
+        if self._cache_version != self.version:
+            self._cache.clear()
+            self._cache_version = self.version
+        result = self._cache.get(key)
+        if result is None:
+            self._cache_misses += 1
+            result = compute()
+            self._cache[key] = result
+            if len(self._cache) > self.cache_maxsize:
+                self._cache.popitem(last=False)
+        else:
+            self._cache_hits += 1
+            self._cache.move_to_end(key)
+        return list(result)
+
+    def cache_info(self):
+        return {"hits": self._cache_hits, "misses": self._cache_misses, "maxsize": self.cache_maxsize,
+                "currsize": len(self._cache)}
+
+    def cache_clear(self):
+        self._cache.clear()
+        self._cache_hits = 0
+        self._cache_misses = 0
+
+    @property
+    def animals(self):
+        # Ordering by name is restored lazily, sorting is stable so animals with same name keep insertion order.
+        if not self._animals_sorted:
+            self._animals.sort(key=lambda x: x.name)
+            self._animals_sorted = True
+        return self._animals
 
     def add_animal(self, name, year_of_birth, gender, date_of_entry, species, breed):
-        if type(name) != str or type(year_of_birth) != int or type(gender) != str or \
-                not isinstance(date_of_entry, datetime.date) or type(species) != str or type(breed) != str:
-            raise RuntimeError("Arguments doesn't match data type requirements.")
+        check_animal_arguments(name, year_of_birth, gender, date_of_entry, species, breed)
 
-        for animal in self.animals:
-            if animal.name == name and animal.year_of_birth == year_of_birth and animal.gender == gender and \
-                    animal.species == species and animal.breed == breed:
-                if animal.date_of_entry == date_of_entry:
-                    return animal
-                else:
-                    raise RuntimeError("Detected same animal with different entry date.")
+        animal = self._animal_index.get((name, year_of_birth, gender, species, breed))
+        if animal is not None:
+            if animal.date_of_entry == date_of_entry:
+                return animal
+            raise RuntimeError("Detected same animal with different entry date.")
 
         animal = Animal(name, year_of_birth, gender, date_of_entry, species, breed, self)
-        self.animals.append(animal)
-        self.animals.sort(key=lambda x: x.name)
+        self._register_animal(animal)
         return animal
 
-    def get_foster_sql(self, sql_id):
-        for foster in self.fosters:
-            if foster.SQL_ID == sql_id:
-                return foster
+    def add_animals(self, records):
+        # Same result as calling add_animal for every record, but nothing is added when any record is invalid.
+        rows = [record_to_row(record, ANIMAL_FIELDS, ANIMAL_FIELDS) for record in records]
+        for row in rows:
+            check_animal_arguments(*row)
+
+        new_animals = {}
+        added = []
+        for name, year_of_birth, gender, date_of_entry, species, breed in rows:
+            key = (name, year_of_birth, gender, species, breed)
+            animal = self._animal_index.get(key)
+            if animal is None:
+                animal = new_animals.get(key)
+            if animal is None:
+                animal = Animal(name, year_of_birth, gender, date_of_entry, species, breed, self)
+                new_animals[key] = animal
+            elif animal.date_of_entry != date_of_entry:
+                raise RuntimeError("Detected same animal with different entry date.")
+            added.append(animal)
+
+        for animal in new_animals.values():
+            self._register_animal(animal)
+        return added
+
+    def _register_animal(self, animal):
+        animal.order = len(self._animals)
+        self._animal_index[animal.identity()] = animal
+        for index in self._attribute_indexes.values():
+            index.add(animal)
+        self._residency.replace(animal, [], animal.residency_intervals())
+        for record in (animal.veterinary_records if animal.veterinary_records is not None else []):
+            self._exams.add(animal, record)
+        if self._animals_sorted and self._animals and self._animals[-1].name > animal.name:
+            self._animals_sorted = False
+        self._animals.append(animal)
+        self.mark_changed()
+
+    def find_animal(self, name, year_of_birth, gender, species, breed):
+        return self._animal_index.get((name, year_of_birth, gender, species, breed))
+
+    def iter_exams(self, start=None, end=None, vet=None):
+        if start is not None:
+            try_argument(start, datetime.date)
+        if end is not None:
+            try_argument(end, datetime.date)
+        if vet is not None:
+            try_argument(vet, str)
+        return self._exams.iter_range(start, end, vet)
+
+    def list_exams(self, start=None, end=None, vet=None):
+        return list(self.iter_exams(start, end, vet))
+
+    def set_sql_id(self, obj, sql_id):
+        obj.SQL_ID = sql_id
+        if type(obj) == Foster:
+            self._fosters_by_sql_id[sql_id] = obj
+        else:
+            self._animals_by_sql_id[sql_id] = obj
+
+    @staticmethod
+    def _get_by_sql_id(lookup, objects, sql_id):
+        # SQL_ID may also be assigned directly, so entries are verified and misses fall back to a scan.
+        obj = lookup.get(sql_id)
+        if obj is not None and obj.SQL_ID == sql_id:
+            return obj
+        for obj in objects:
+            if obj.SQL_ID == sql_id:
+                lookup[sql_id] = obj
+                return obj
         return None
 
+    def get_foster_sql(self, sql_id):
+        return self._get_by_sql_id(self._fosters_by_sql_id, self.fosters, sql_id)
+
+    def get_animal_sql(self, sql_id):
+        return self._get_by_sql_id(self._animals_by_sql_id, self.animals, sql_id)
+
     def list_animals(self, date, name=None, year_of_birth=None, gender=None, date_of_entry=None,
                      species=None, breed=None):
-        animals_copy = []
-        for animal_copy in self.animals:
-            animals_copy.append(animal_copy)
-
         try_argument(date, datetime.date)
-        animals_copy = list(filter(lambda animal: (animal.check_if_is_in_shelter(date)), animals_copy))
-
-        if name is not None:
-            try_argument(name, str)
-            animals_copy = list(filter(lambda animal: (animal.name == name), animals_copy))
-
-        if year_of_birth is not None:
-            try_argument(year_of_birth, int)
-            animals_copy = list(filter(lambda animal: (animal.year_of_birth == year_of_birth), animals_copy))
-
-        if gender is not None:
-            try_argument(gender, str)
-            animals_copy = list(filter(lambda animal: (animal.gender == gender), animals_copy))
+        filters = self._collect_filters(name=name, year_of_birth=year_of_birth, gender=gender,
+                                        date_of_entry=date_of_entry, species=species, breed=breed)
+        if not filters:
+            return self._cached(("list_animals", date, ()), lambda: self._list_residents(date))
+        return self._cached(("list_animals", date, tuple(filters)), lambda: list(self._iter_matching(date, filters)))
+
+    def _list_residents(self, date):
+        residents = self._residency.residents(date)
+        if len(residents) * RESIDENTS_SORT_SHARE < len(self._animals):
+            return sorted(residents, key=shelter_order)
+        residents = set(residents)
+        return [animal for animal in self.animals if animal in residents]
+
+    def iter_animals(self, date, **filters):
+        try_argument(date, datetime.date)
+        if any(attribute not in dict(INDEXED_ATTRIBUTES) for attribute in filters):
+            raise RuntimeError("Unknown filter.")
+        return AnimalQuery(self, date, self._collect_filters(**filters))
+
+    @staticmethod
+    def _collect_filters(**filters):
+        collected = []
+        for attribute, type_value in INDEXED_ATTRIBUTES:
+            value = filters.get(attribute)
+            if value is not None:
+                try_argument(value, type_value)
+                collected.append((attribute, value))
+        return collected
+
+    def _plan_candidates(self, filters):
+        # Start from the smallest bucket of all filtered attributes, rest of filters are checked on its members.
+        if not filters:
+            return self.animals, []
+
+        best_bucket = None
+        best_attribute = None
+        for attribute, value in filters:
+            bucket = self._attribute_indexes[attribute].get(value)
+            if best_bucket is None or len(bucket) < len(best_bucket):
+                best_bucket = bucket
+                best_attribute = attribute
+            if len(best_bucket) == 0:
+                return [], []
+        return best_bucket, [(attribute, value) for attribute, value in filters if attribute != best_attribute]
+
+    def _iter_matching(self, date, filters):
+        candidates, rest = self._plan_candidates(filters)
+        for animal in candidates:
+            for attribute, value in rest:
+                if getattr(animal, attribute) != value:
+                    break
+            else:
+                if animal.check_if_is_in_shelter(date):
+                    yield animal
+
+    def place_in_foster_batch(self, animals, date, policy="least_loaded"):
+        try_argument(date, datetime.date)
+        if policy not in PLACEMENT_POLICIES:
+            raise RuntimeError("Unknown placement policy.")
+        animals = list(animals)
+        if len(set(animals)) != len(animals):
+            raise RuntimeError("Animal can be placed only once.")
+        for animal in animals:
+            if type(animal) != Animal or animal.shelter is not self:
+                raise RuntimeError("Arguments doesn't match data type requirements.")
+            animal.check_if_is_in_shelter_raise(date)
+
+        capacity = [[foster, foster.max_animals - foster.load(date)] for foster in self.fosters]
+        capacity = [slot for slot in capacity if slot[1] > 0]
+        if sum(free for _, free in capacity) < len(animals):
+            raise RuntimeError("Selected parent doesn't exist or reached limit for animals in selected time.")
+
+        placement = []
+        if policy == "fill_first":
+            slots = iter(foster for foster, free in capacity for _ in range(free))
+            placement = [(animal, next(slots)) for animal in animals]
+        elif policy == "round_robin":
+            queue = collections.deque(capacity)
+            for animal in animals:
+                slot = queue.popleft()
+                placement.append((animal, slot[0]))
+                slot[1] -= 1
+                if slot[1] > 0:
+                    queue.append(slot)
+        else:
+            heap = [(foster.max_animals - free, position, free) for position, (foster, free) in enumerate(capacity)]
+            heapq.heapify(heap)
+            for animal in animals:
+                load, position, free = heapq.heappop(heap)
+                placement.append((animal, capacity[position][0]))
+                if free > 1:
+                    heapq.heappush(heap, (load + 1, position, free - 1))
+
+        for animal, foster in placement:
+            animal.start_foster(date, foster, True)
+        return placement
+
+    def available_foster_parents_between(self, start, end):
+        return [foster for foster in self.fosters if foster.free_slots(start, end) > 0]
+
+    def occupancy_series(self, start, end, step=1, group_by=None):
+        try_argument(start, datetime.date)
+        try_argument(end, datetime.date)
+        try_argument(step, int)
+        if step < 1 or (group_by is not None and group_by not in dict(INDEXED_ATTRIBUTES)):
+            raise RuntimeError("Arguments doesn't match data type requirements.")
 
-        if date_of_entry is not None:
-            try_argument(date_of_entry, datetime.date)
-            animals_copy = list(filter(lambda animal: (animal.date_of_entry == date_of_entry), animals_copy))
+        events = []
+        groups = {} if group_by is not None else {None: None}
+        for animal in self.animals:
+            group = getattr(animal, group_by) if group_by is not None else None
+            groups[group] = None
+            for state, period_from, period_to in animal.state_periods():
+                events.append((period_from, group, state, 1))
+                if period_to != MAX_ORDINAL:
+                    events.append((period_to + 1, group, state, -1))
+        events.sort(key=lambda x: x[0])
+
+        counts = {group: dict.fromkeys(OCCUPANCY_STATES, 0) for group in groups}
+        series = []
+        position = 0
+        for point in range(start.toordinal(), end.toordinal() + 1, step):
+            while position < len(events) and events[position][0] <= point:
+                _, group, state, change = events[position]
+                counts[group][state] += change
+                position += 1
+            if group_by is None:
+                series.append((datetime.date.fromordinal(point), dict(counts[None])))
+            else:
+                series.append((datetime.date.fromordinal(point),
+                               {group: dict(group_counts) for group, group_counts in counts.items()}))
+        return series
+
+    def stats(self, metrics=None, group_by=None, start=None, end=None):
+        # Animals count when they entered before end and weren't adopted before start,
+        # adoptions, closed foster episodes and exams count when they happened inside the window.
+        metrics = STATISTICS if metrics is None else tuple(metrics)
+        if any(metric not in STATISTICS for metric in metrics) or \
+                (group_by is not None and group_by not in dict(INDEXED_ATTRIBUTES)):
+            raise RuntimeError("Arguments doesn't match data type requirements.")
+        if start is not None:
+            try_argument(start, datetime.date)
+        if end is not None:
+            try_argument(end, datetime.date)
 
-        if species is not None:
-            try_argument(species, str)
-            animals_copy = list(filter(lambda animal: (animal.species == species), animals_copy))
+        def in_window(date):
+            return (start is None or date >= start) and (end is None or date <= end)
 
-        if breed is not None:
-            try_argument(breed, str)
-            animals_copy = list(filter(lambda animal: (animal.breed == breed), animals_copy))
-        return animals_copy
+        totals = {}
+        for animal in self.animals:
+            adoption = animal.adopter[1] if animal.adopter is not None else None
+            if (end is not None and animal.date_of_entry > end) or \
+                    (start is not None and adoption is not None and adoption < start):
+                continue
+            group = getattr(animal, group_by) if group_by is not None else None
+            total = totals.get(group)
+            if total is None:
+                total = totals[group] = {"animals": 0, "adopted": 0, "stays": [], "episodes": 0, "episode_days": 0,
+                                         "exams": 0}
+            total["animals"] += 1
+
+            if adoption is not None and in_window(adoption):
+                total["adopted"] += 1
+                total["stays"].append(max(0, (adoption - animal.date_of_entry).days))
+            if "foster_episode_duration" in metrics:
+                for record in (animal.foster_records if animal.foster_records is not None else []):
+                    if record.period_to is not None and in_window(record.period_from):
+                        total["episodes"] += 1
+                        total["episode_days"] += (record.period_to - record.period_from).days + 1
+            if "exams_per_animal" in metrics:
+                total["exams"] += len(animal.list_exams(start, end))
+
+        results = {}
+        for group, total in totals.items():
+            result = results[group] = {}
+            if "length_of_stay" in metrics:
+                stays = total["stays"]
+                result["length_of_stay"] = {"count": len(stays)}
+                if stays:
+                    result["length_of_stay"].update(min=min(stays), median=statistics.median(stays),
+                                                    mean=statistics.fmean(stays), max=max(stays))
+            if "adoption_rate" in metrics:
+                result["adoption_rate"] = total["adopted"] / total["animals"]
+            if "foster_episode_duration" in metrics:
+                result["foster_episode_duration"] = {
+                    "count": total["episodes"],
+                    "mean": total["episode_days"] / total["episodes"] if total["episodes"] else None}
+            if "exams_per_animal" in metrics:
+                result["exams_per_animal"] = total["exams"] / total["animals"]
+        return results
 
     def add_foster_parent(self, name, address, phone_number, max_animals, sql_id=None):
-        if type(name) != str or type(address) != str or type(phone_number) != str or type(max_animals) != int:
-            raise RuntimeError("Arguments doesn't match data type requirements.")
+        check_foster_arguments(name, address, phone_number, max_animals)
 
-        for foster_v in self.fosters:
-            if foster_v.name == name and foster_v.address == address and foster_v.phone_number == phone_number:
-                if foster_v.max_animals == max_animals:
-                    return foster_v
-                else:
-                    raise RuntimeError("Detected same foster with different animal limit.")
+        foster_v = self._foster_index.get((name, address, phone_number))
+        if foster_v is not None:
+            if foster_v.max_animals == max_animals:
+                return foster_v
+            raise RuntimeError("Detected same foster with different animal limit.")
 
         foster = Foster(name, address, phone_number, max_animals)
         if sql_id is not None:
             foster.SQL_ID = sql_id
+        self.register_foster(foster)
+        return foster
+
+    def add_foster_parents_bulk(self, records):
+        # Same result as calling add_foster_parent for every record, but nothing is added when any record is invalid.
+        rows = [record_to_row(record, FOSTER_FIELDS, FOSTER_FIELDS[:4]) for record in records]
+        for row in rows:
+            check_foster_arguments(*row[:4])
+
+        new_fosters = {}
+        added = []
+        for row in rows:
+            name, address, phone_number, max_animals = row[:4]
+            key = (name, address, phone_number)
+            foster = self._foster_index.get(key)
+            if foster is None:
+                foster = new_fosters.get(key)
+            if foster is None:
+                foster = Foster(name, address, phone_number, max_animals)
+                if len(row) > 4 and row[4] is not None:
+                    foster.SQL_ID = row[4]
+                new_fosters[key] = foster
+            elif foster.max_animals != max_animals:
+                raise RuntimeError("Detected same foster with different animal limit.")
+            added.append(foster)
+
+        for foster in new_fosters.values():
+            self.register_foster(foster)
+        return added
+
+    def register_foster(self, foster):
+        self._foster_index[foster.identity()] = foster
+        if foster.SQL_ID is not None:
+            self._fosters_by_sql_id[foster.SQL_ID] = foster
+        self.mark_changed()
         self.fosters.append(foster)
 
-    def amount_of_animals_in_care(self, parent, date):
-        counter = 0
-        for animal in self.animals:
-            if animal.foster_records is None:
-                continue
-            for record in animal.foster_records:
-                if record.foster != parent:
-                    continue
+    def find_foster(self, name, address, phone_number):
+        return self._foster_index.get((name, address, phone_number))
+
+    def has_foster(self, foster):
+        # Fosters appended to Shelter.fosters directly aren't indexed, those are found by the scan.
+        return self._foster_index.get(foster.identity()) is foster or foster in self.fosters
 
-                if record.is_active(date):
-                    counter += 1
-        return counter
+    def amount_of_animals_in_care(self, parent, date):
+        return parent.load(date)
 
     def available_foster_parents(self, date):
-        available_fosters = []
-        for foster in self.fosters:
-            if self.amount_of_animals_in_care(foster, date) < foster.max_animals:
-                available_fosters.append(foster)
-        return available_fosters
+        # Not cached, fosters may be appended or have their limit changed directly.
+        return [foster for foster in self.fosters if foster.has_capacity(date)]
+
+
+class AnimalQuery:
+    # Lazy result of Shelter.iter_animals, every iteration makes one fused pass over the planned candidates.
+    def __init__(self, shelter, date, filters):
+        self.shelter = shelter
+        self.date = date
+        self.filters = filters
+
+    def __iter__(self):
+        return self.shelter._iter_matching(self.date, self.filters)
+
+    def count(self):
+        return sum(1 for _ in self)
+
+    def first(self, n=1):
+        try_argument(n, int)
+        return list(itertools.islice(self, max(n, 0)))
+
+    def page(self, offset, limit):
+        try_argument(offset, int)
+        try_argument(limit, int)
+        if offset < 0 or limit < 0:
+            raise RuntimeError("Invalid page.")
+        return list(itertools.islice(self, offset, offset + limit))
 
 
 class Animal:
+    __slots__ = ("shelter", "name", "year_of_birth", "gender", "date_of_entry", "species", "breed",
+                 "_veterinary_records", "_exam_dates", "foster_records", "_open_records", "_care_steps", "order",
+                 "_adopter", "SQL_ID")
+
     def __init__(self, name, year_of_birth, gender, date_of_entry, species, breed, shelter,
                  veterinary_records=None, foster_records=None, adopter=None):
         self.shelter = shelter
+        self.order = None
+        self._veterinary_records = None
+        self._open_records = None
+        self._care_steps = None
+        self._adopter = None
         self.name = name
         self.year_of_birth = year_of_birth
         self.gender = gender
@@ -121,17 +692,164 @@ class Animal:
         self.adopter = adopter
         self.SQL_ID = None
 
+    @property
+    def veterinary_records(self):
+        return self._veterinary_records
+
+    @veterinary_records.setter
+    def veterinary_records(self, value):
+        # Records are kept ordered by date (stable for same dates), _exam_dates mirrors them for bisection.
+        if value is not None:
+            value = sorted(value, key=lambda x: x.date)
+            self._exam_dates = [record.date for record in value]
+        else:
+            self._exam_dates = None
+        if self.order is not None and self._veterinary_records:
+            self.shelter._exams.remove_animal(self)
+        self._veterinary_records = value
+        if self.order is not None:
+            for record in (value if value is not None else []):
+                self.shelter._exams.add(self, record)
+            self.shelter.mark_changed()
+
+    @property
+    def adopter(self):
+        return self._adopter
+
+    @adopter.setter
+    def adopter(self, value):
+        old_stay_end = self._stay_end()
+        self._adopter = value
+        # Only periods after the earlier of the two adoption dates can change.
+        first = min(old_stay_end, self._stay_end())
+        self._residency_moved(self._shelter_periods(first, MAX_ORDINAL, old_stay_end),
+                              self._shelter_periods(first, MAX_ORDINAL, self._stay_end()))
+
+    def _residency_moved(self, old_periods, new_periods):
+        # Passes the periods that changed to the residency index, also bumps the version of shelter caches.
+        if self.order is not None:
+            self.shelter._residency.replace(self, [period for period in old_periods if period not in new_periods],
+                                            [period for period in new_periods if period not in old_periods])
+            self.shelter.mark_changed()
+
+    def _stay_end(self):
+        return self._adopter[1].toordinal() - 1 if self._adopter is not None else MAX_ORDINAL
+
+    def _build_care_steps(self):
+        # Step function of the number of foster records covering a day, every step is packed as
+        # point << KEY_BITS | count and the count holds from its point until the next one.
+        # It starts at the date of entry and neighbouring steps never have the same count.
+        if self._care_steps is None:
+            entry = self.date_of_entry.toordinal()
+            events = []
+            for record in (self.foster_records if self.foster_records is not None else []):
+                start, end = record.ordinal_bounds()
+                start = max(start, entry)
+                if start <= end:
+                    events.append((start, 1))
+                    if end != MAX_ORDINAL:
+                        events.append((end + 1, -1))
+            events.sort()
+
+            steps = [(entry, 0)]
+            count = 0
+            for point, change in events:
+                count += change
+                if point == steps[-1][0]:
+                    steps[-1] = (point, count)
+                else:
+                    steps.append((point, count))
+            care_steps = array.array("q")
+            for point, count in steps:
+                if not care_steps or care_steps[-1] & KEY_MASK != count:
+                    care_steps.append(point << KEY_BITS | count)
+            self._care_steps = care_steps
+        return self._care_steps
+
+    def _find_care_step(self, point):
+        return bisect.bisect_right(self._care_steps, point << KEY_BITS | KEY_MASK) - 1
+
+    def _split_care_steps(self, point):
+        steps = self._care_steps
+        position = self._find_care_step(point)
+        if steps[position] >> KEY_BITS != point:
+            position += 1
+            steps.insert(position, point << KEY_BITS | steps[position - 1] & KEY_MASK)
+        return position
+
+    def _update_care(self, start, end, change):
+        # Adds change to the number of records covering [start, end], the index gets only the periods that moved.
+        # The care steps have to be built before the records change.
+        steps = self._care_steps
+        start = max(start, steps[0] >> KEY_BITS)
+        if start > end:
+            self._residency_moved([], [])
+            return
+
+        stay_end = self._stay_end()
+        after = end + 1 if end != MAX_ORDINAL else MAX_ORDINAL
+        old_periods = self._shelter_periods(start - 1, after, stay_end)
+        low = self._split_care_steps(start)
+        high = self._split_care_steps(end + 1) if end != MAX_ORDINAL else len(steps)
+        for position in range(low, high):
+            steps[position] += change
+        if high < len(steps) and (steps[high] ^ steps[high - 1]) & KEY_MASK == 0:
+            del steps[high]
+        if low > 0 and (steps[low] ^ steps[low - 1]) & KEY_MASK == 0:
+            del steps[low]
+        self._residency_moved(old_periods, self._shelter_periods(start - 1, after, stay_end))
+
+    def _shelter_periods(self, first, last, stay_end):
+        # In-shelter periods overlapping [first, last], cut at the day before adoption.
+        if self._care_steps is None and not self.foster_records:
+            entry = self.date_of_entry.toordinal()
+            return [(entry, stay_end)] if entry <= min(last, stay_end) and first <= stay_end else []
+        steps = self._build_care_steps()
+        periods = []
+        position = max(self._find_care_step(first), 0)
+        while position < len(steps) and steps[position] >> KEY_BITS <= min(last, stay_end):
+            if steps[position] & KEY_MASK == 0:
+                end = (steps[position + 1] >> KEY_BITS) - 1 if position + 1 < len(steps) else MAX_ORDINAL
+                periods.append((steps[position] >> KEY_BITS, min(end, stay_end)))
+            position += 1
+        return periods
+
+    def state_periods(self):
+        # Inclusive ordinal periods of every state from OCCUPANCY_STATES since the date of entry.
+        entry = self.date_of_entry.toordinal()
+        periods = []
+        stay_end = MAX_ORDINAL
+        if self.adopter is not None:
+            adopted_from = max(entry, self.adopter[1].toordinal())
+            periods.append(("adopted", adopted_from, MAX_ORDINAL))
+            stay_end = adopted_from - 1
+
+        last = entry
+        for start, end in self.residency_intervals():
+            if start > last:
+                periods.append(("in_foster", last, start - 1))
+            periods.append(("in_shelter", start, end))
+            last = end + 1
+        if last <= stay_end:
+            periods.append(("in_foster", last, stay_end))
+        return periods
+
+    def residency_intervals(self):
+        # Inclusive ordinal periods when the animal is in the shelter, i.e. entered, not adopted and not fostered.
+        return self._shelter_periods(self.date_of_entry.toordinal(), MAX_ORDINAL, self._stay_end())
+
     def start_foster(self, date, parent, ignore=False, end=None):
         if not isinstance(date, datetime.date) or type(parent) != Foster:
             raise RuntimeError("Arguments doesn't match data type requirements.")
         if not ignore:
-            if parent not in self.shelter.available_foster_parents(date):
+            if not self.shelter.has_foster(parent) or not parent.has_capacity(date):
                 raise RuntimeError("Selected parent doesn't exist or reached limit for animals in selected time.")
             self.check_if_is_in_shelter_raise(date)
 
+        self._build_care_steps()
         if self.foster_records is None:
             self.foster_records = []
-        rec = FosterRecord(parent, date)
+        rec = FosterRecord(parent, date, self)
         self.foster_records.append(rec)
         parent.animals_in_care.add(self)  # The most important line :D
 
@@ -139,6 +857,15 @@ class Animal:
             if type(end) == date:
                 raise RuntimeError("Invalid end argument.")
             rec.period_to = end
+        elif self._open_records is None:
+            self._open_records = [rec]
+        else:
+            self._open_records.append(rec)
+        parent.add_record(rec)
+        self._update_care(*rec.ordinal_bounds(), 1)
+
+    def identity(self):
+        return self.name, self.year_of_birth, self.gender, self.species, self.breed
 
     def compare_with_sql(self, data):
         if data is not None and len(data) == 6:
@@ -149,18 +876,20 @@ class Animal:
 
     def end_foster(self, date):
         try_argument(date, datetime.date)
-        found_valid = False
-        if self.foster_records is None:
+        record = self.open_foster_record
+        if record is None:
             raise RuntimeError("This animal isn't in foster care.")
 
-        for record in self.foster_records:
-            if record.period_to is None:
-                found_valid = True
-                record.period_to = date
-                break
+        self._build_care_steps()
+        self._open_records.pop(0)
+        start, end = record.ordinal_bounds()
+        record.foster.end_record(record, date)
+        self._update_care(max(start, date.toordinal() + 1), end, -1)
 
-        if not found_valid:
-            raise RuntimeError("This animal isn't in foster care.")
+    @property
+    def open_foster_record(self):
+        # Open records are kept in the order of foster_records, end_foster closes the first one.
+        return self._open_records[0] if self._open_records else None
 
     def adopt(self, date, adopter_name, adopter_address):
         if not isinstance(date, datetime.date) or type(adopter_address) != str or type(adopter_name) != str:
@@ -173,19 +902,19 @@ class Animal:
             raise RuntimeError("This animal is now in foster care or adopted.")
 
     def check_if_is_in_shelter(self, date):
-        if self.date_of_entry > date:
-            return False
-
-        if self.adopter is not None and self.adopter[1] <= date:
-            return False
-
-        if self.foster_records is None:
-            return True
-
-        for record in self.foster_records:
-            if record.is_active(date):
-                return False
-        return True
+        return self.state(date) == "in_shelter"
+
+    def state(self, date):
+        # One of OCCUPANCY_STATES, None before the date of entry.
+        point = date.toordinal()
+        if point < self.date_of_entry.toordinal():
+            return None
+        if point > self._stay_end():
+            return "adopted"
+        if self._care_steps is None and not self.foster_records:
+            return "in_shelter"
+        self._build_care_steps()
+        return "in_foster" if self._care_steps[self._find_care_step(point)] & KEY_MASK else "in_shelter"
 
     def add_exam(self, vet, date, report):
         if type(vet) != str or not isinstance(date, datetime.date) or type(report) != str:
@@ -194,44 +923,149 @@ class Animal:
 
         if self.veterinary_records is None:
             self.veterinary_records = []
-        self.veterinary_records.append(VetRecord(vet, date, report))
+        record = VetRecord(vet, date, report)
+        position = bisect.bisect_right(self._exam_dates, date)
+        self._exam_dates.insert(position, date)
+        self._veterinary_records.insert(position, record)
+        if self.order is not None:
+            self.shelter._exams.add(self, record)
+            self.shelter.mark_changed()
 
     def list_exams(self, start, end):
-        copy_veterinary_records = []
-        if self.veterinary_records is not None:
-            for record in self.veterinary_records:
-                copy_veterinary_records.append(record)
+        if self.veterinary_records is None:
+            return []
+        if len(self._exam_dates) != len(self._veterinary_records):
+            self.veterinary_records = self._veterinary_records
 
-            if start is not None:
-                try_argument(start, datetime.date)
-                copy_veterinary_records = list(filter(lambda rec: (rec.date >= start), copy_veterinary_records))
+        low = 0
+        high = len(self._exam_dates)
+        if start is not None:
+            try_argument(start, datetime.date)
+            low = bisect.bisect_left(self._exam_dates, start)
 
-            if end is not None:
-                try_argument(end, datetime.date)
-                copy_veterinary_records = list(filter(lambda rec: (rec.date <= end), copy_veterinary_records))
-        return copy_veterinary_records
+        if end is not None:
+            try_argument(end, datetime.date)
+            high = bisect.bisect_right(self._exam_dates, end)
+        return self._veterinary_records[low:high]
 
 
 class FosterRecord:
-    def __init__(self, foster, period_from):
+    __slots__ = ("foster", "animal", "period_from", "period_to")
+
+    def __init__(self, foster, period_from, animal=None):
         self.foster = foster
+        self.animal = animal
         self.period_from = period_from
         self.period_to = None
 
+    def ordinal_bounds(self):
+        return self.period_from.toordinal(), \
+               self.period_to.toordinal() if self.period_to is not None else MAX_ORDINAL
+
     def is_active(self, date):
         return (self.period_to is None and self.period_from <= date) or \
                (self.period_to is not None and self.period_to >= date >= self.period_from)
 
 
 class Foster:
+    __slots__ = ("name", "address", "phone_number", "max_animals", "animals_in_care", "foster_records",
+                 "_record_keys", "_starts", "_ends", "_timeline", "SQL_ID")
+
     def __init__(self, name, address, phone_number, max_animals=1):
         self.name = name
         self.address = address
         self.phone_number = phone_number
         self.max_animals = max_animals
         self.animals_in_care = set()
+        self.foster_records = []
+        self._record_keys = array.array("q")
+        self._starts = array.array("q")
+        self._ends = array.array("q")
+        self._timeline = None
         self.SQL_ID = None
 
+    def add_record(self, record):
+        # Records are ordered by start, active records on a date are counted from sorted start and end ordinals.
+        key = record.period_from.toordinal()
+        position = bisect.bisect_right(self._record_keys, key)
+        self._record_keys.insert(position, key)
+        self.foster_records.insert(position, record)
+        self._add_bounds(record)
+
+    def end_record(self, record, date):
+        self._remove_bounds(record)
+        record.period_to = date
+        self._add_bounds(record)
+
+    def _add_bounds(self, record):
+        start, end = record.ordinal_bounds()
+        if start <= end:
+            bisect.insort(self._starts, start)
+            bisect.insort(self._ends, end)
+            self._timeline = None
+
+    def _remove_bounds(self, record):
+        start, end = record.ordinal_bounds()
+        if start <= end:
+            del self._starts[bisect.bisect_left(self._starts, start)]
+            del self._ends[bisect.bisect_left(self._ends, end)]
+            self._timeline = None
+
+    def load(self, date):
+        point = date.toordinal()
+        return bisect.bisect_right(self._starts, point) - bisect.bisect_left(self._ends, point)
+
+    def has_capacity(self, date):
+        return self.load(date) < self.max_animals
+
+    def _build_timeline(self):
+        # Step function of the load, loads[i] holds from points[i] until the next point.
+        if self._timeline is None:
+            points = []
+            loads = []
+            load = 0
+            ends = [end + 1 for end in self._ends if end != MAX_ORDINAL]
+            start_index = end_index = 0
+            while start_index < len(self._starts) or end_index < len(ends):
+                if end_index == len(ends) or \
+                        (start_index < len(self._starts) and self._starts[start_index] < ends[end_index]):
+                    point = self._starts[start_index]
+                else:
+                    point = ends[end_index]
+                while start_index < len(self._starts) and self._starts[start_index] == point:
+                    load += 1
+                    start_index += 1
+                while end_index < len(ends) and ends[end_index] == point:
+                    load -= 1
+                    end_index += 1
+                points.append(point)
+                loads.append(load)
+            self._timeline = points, loads
+        return self._timeline
+
+    def timeline(self):
+        points, loads = self._build_timeline()
+        return [(datetime.date.fromordinal(point), load) for point, load in zip(points, loads)]
+
+    def max_load(self, start, end):
+        try_argument(start, datetime.date)
+        try_argument(end, datetime.date)
+        if start > end:
+            raise RuntimeError("Invalid time period.")
+        points, loads = self._build_timeline()
+        first = bisect.bisect_right(points, start.toordinal()) - 1
+        last = bisect.bisect_right(points, end.toordinal())
+        highest = loads[first] if first >= 0 else 0
+        for index in range(first + 1, last):
+            highest = max(highest, loads[index])
+        return highest
+
+    def free_slots(self, start, end):
+        return max(0, self.max_animals - self.max_load(start, end))
+
+    def identity(self):
+        return self.name, self.address, self.phone_number
+
     def compare_foster_with_sql(self, data):
         if data is not None and len(data) == 4:
             if self.name == data[1] and self.address == data[2] and self.phone_number == data[3]:
@@ -240,12 +1074,16 @@ class Foster:
 
 
 class Adopter:
+    __slots__ = ("name", "address")
+
     def __init__(self, name, address):
         self.name = name
         self.address = address
 
 
 class VetRecord:
+    __slots__ = ("date", "vet", "report")
+
     def __init__(self, vet, date, report):
         self.date = date
         self.vet = vet
@@ -276,6 +1114,81 @@ def test_add_animal():
     shelter.add_animal('Pleb', 1999, 'male', datetime.date(2018, 6, 1), 'dog', 'labrador')
 
 
+def test_add_animal_duplicates():
+    date1, date2, date3, shelter = make_test_shelter()
+    marry = shelter.find_animal('Marry', 1999, 'male', 'dog', 'labrador')
+    assert marry is not None
+    assert shelter.add_animal('Marry', 1999, 'male', date1, 'dog', 'labrador') is marry
+    assert len(shelter.animals) == 3
+
+    try:
+        shelter.add_animal('Marry', 1999, 'male', date2, 'dog', 'labrador')
+        raise AssertionError()
+    except RuntimeError:
+        pass
+
+    shelter.add_animal('Adam', 2001, 'male', date1, 'dog', 'labrador')
+    assert [animal.name for animal in shelter.animals] == ['Adam', 'Adam', 'James', 'Marry']
+    assert shelter.animals[0].year_of_birth == 2000
+
+
+def test_bulk_add():
+    date1, date2, date3, shelter = make_test_shelter()
+    animals = shelter.add_animals([('Zoe', 2010, 'female', date2, 'cat', 'persian'),
+                                   {"name": 'Bob', "year_of_birth": 2011, "gender": 'male', "date_of_entry": date3,
+                                    "species": 'cat', "breed": 'persian'},
+                                   ('Marry', 1999, 'male', date1, 'dog', 'labrador'),
+                                   ('Zoe', 2010, 'female', date2, 'cat', 'persian')])
+    assert animals[0] is animals[3]
+    assert animals[2] is shelter.find_animal('Marry', 1999, 'male', 'dog', 'labrador')
+    assert [animal.name for animal in shelter.animals] == ['Adam', 'Bob', 'James', 'Marry', 'Zoe']
+    assert [animal.name for animal in shelter.list_animals(date3, species='cat')] == ['Bob', 'Zoe']
+
+    for records in ([('Ann', 2010, 'female', date2, 'cat', 'persian'), ('Adam', 2000, 'female', date1, 'rat', 'small')],
+                    [('Ann', 2010, 'female', date2, 'cat', 'persian'), ('Eve', '2010', 'female', date2, 'cat', 'x')],
+                    [('Ann', 2010, 'female', date2, 'cat'), {"name": 'Eve'}]):
+        try:
+            shelter.add_animals(records)
+            raise AssertionError()
+        except RuntimeError:
+            pass
+        assert len(shelter.animals) == 5
+
+    add_foster_parents(shelter)
+    fosters = shelter.add_foster_parents_bulk([('Boris', 'New York', '12345', 3),
+                                               {"name": 'Eva', "address": 'Brno', "phone_number": '111',
+                                                "max_animals": 2, "sql_id": 7}])
+    assert fosters[0] is shelter.fosters[0] and fosters[1] is shelter.find_foster('Eva', 'Brno', '111')
+    assert fosters[1].SQL_ID == 7 and len(shelter.fosters) == 4
+    try:
+        shelter.add_foster_parents_bulk([('Ivo', 'Brno', '112', 2), ('Lena', 'Moscow', '123456', 2)])
+        raise AssertionError()
+    except RuntimeError:
+        pass
+    assert len(shelter.fosters) == 4
+
+
+def test_sql_id_lookup():
+    date1, date2, date3, shelter = make_test_shelter()
+    add_foster_parents(shelter)
+    boris, lena, roman = shelter.fosters
+    eva = shelter.add_foster_parent('Eva', 'Brno', '111', 2, 12)
+    assert shelter.get_foster_sql(12) is eva
+
+    shelter.set_sql_id(boris, 3)
+    shelter.set_sql_id(shelter.animals[0], 3)
+    assert shelter.get_foster_sql(3) is boris
+    assert shelter.get_animal_sql(3) is shelter.animals[0]
+    assert shelter.get_animal_sql(4) is None
+
+    shelter.set_sql_id(lena, 3)
+    assert shelter.get_foster_sql(3) is lena
+    roman.SQL_ID = 5
+    assert shelter.get_foster_sql(5) is roman
+    lena.SQL_ID = None
+    assert shelter.get_foster_sql(3) is boris
+
+
 def test_list_animals_basic():
     date1, date2, date3, shelter = make_test_shelter()
 
@@ -309,6 +1222,257 @@ def test_list_animals_basic():
     assert animals[0].name == 'Marry'
 
 
+def test_list_animals_filters():
+    date1, date2, date3, shelter = make_test_shelter()
+    shelter.add_animal('Bella', 2015, 'female', date3, 'dog', 'labrador')
+    shelter.add_animal('Aron', 2016, 'male', date1, 'dog', 'labrador')
+
+    animals = shelter.list_animals(date1, breed='labrador')
+    assert [animal.name for animal in animals] == ['Aron', 'Bella', 'Marry']
+
+    animals = shelter.list_animals(date3, breed='labrador', species='dog')
+    assert [animal.name for animal in animals] == ['Bella']
+
+    assert shelter.list_animals(date1, breed='labrador', gender='female', year_of_birth=2016) == []
+    assert shelter.list_animals(date1, breed='poodle') == []
+    assert [animal.name for animal in shelter.list_animals(date1, date_of_entry=date3)] == ['Bella', 'James']
+    assert shelter.list_animals(date1, name='James')[0].breed == 'big'
+
+    try:
+        shelter.list_animals(date1, breed=1)
+        raise AssertionError()
+    except RuntimeError:
+        pass
+
+
+def test_residency_index():
+    date1, date2, date3, shelter = make_test_shelter()
+    add_foster_parents(shelter)
+    adam = shelter.find_animal('Adam', 2000, 'female', 'rat', 'small')
+    james = shelter.find_animal('James', 1980, 'female', 'rat', 'big')
+    boris = shelter.fosters[0]
+
+    adam.start_foster(datetime.date(2012, 1, 1), boris)
+    adam.end_foster(datetime.date(2012, 12, 31))
+    james.start_foster(datetime.date(2015, 1, 1), boris)
+    james.adopt(datetime.date(2011, 1, 1), 'Patrick', 'Prague')
+
+    assert adam.residency_intervals() == [(date2.toordinal(), datetime.date(2011, 12, 31).toordinal()),
+                                          (datetime.date(2013, 1, 1).toordinal(), MAX_ORDINAL)]
+    assert james.residency_intervals() == [(date3.toordinal(), datetime.date(2010, 12, 31).toordinal())]
+
+    checks = [datetime.date(2010, 6, 1), datetime.date(2010, 12, 31), datetime.date(2011, 1, 1),
+              datetime.date(2012, 6, 1), datetime.date(2013, 1, 1), date1, datetime.date(2030, 1, 1)]
+    for when in checks:
+        expected = [animal for animal in shelter.animals if animal.check_if_is_in_shelter(when)]
+        assert shelter.list_animals(when) == expected
+        assert sorted(shelter._residency.residents(when), key=shelter_order) == expected
+
+    for index in range(40):
+        shelter.add_animal('Pet' + str(index), 2000, 'male', date2 + datetime.timedelta(days=index), 'cat', 'any')
+    when = date2 + datetime.timedelta(days=20)
+    assert len(shelter.list_animals(when, species='cat')) == 21
+    assert shelter.list_animals(when) == [animal for animal in shelter.animals if animal.check_if_is_in_shelter(when)]
+
+
+def test_residency_updates():
+    # Step by step updates of one animal compared with a day by day check of its records.
+    date1, date2, date3, shelter = make_test_shelter()
+    add_foster_parents(shelter)
+    boris = shelter.fosters[0]
+    adam = shelter.find_animal('Adam', 2000, 'female', 'rat', 'small')
+    entry = adam.date_of_entry
+    adopter = Adopter('Patrick', 'Prague')
+
+    def day(offset):
+        return entry + datetime.timedelta(days=offset)
+
+    changes = [lambda: adam.start_foster(day(-10), boris, True, day(-5)),
+               lambda: adam.start_foster(day(-3), boris, True, day(4)),
+               lambda: adam.start_foster(day(10), boris, True),
+               lambda: adam.start_foster(day(20), boris, True, day(30)),
+               lambda: adam.start_foster(day(25), boris, True),
+               lambda: adam.end_foster(day(27)),
+               lambda: adam.end_foster(day(26)),
+               lambda: adam.start_foster(day(50), boris, True, day(40)),
+               lambda: adam.start_foster(day(60), boris, True),
+               lambda: setattr(adam, 'adopter', (adopter, day(65))),
+               lambda: setattr(adam, 'adopter', (adopter, day(100))),
+               lambda: adam.end_foster(day(70)),
+               lambda: setattr(adam, 'adopter', None),
+               lambda: adam.start_foster(day(31), boris, True, day(31)),
+               lambda: setattr(adam, 'adopter', (adopter, day(55)))]
+    for change in changes:
+        change()
+        adopted = adam.adopter[1] if adam.adopter is not None else datetime.date.max
+        in_shelter = [offset for offset in range(-15, 120)
+                      if entry <= day(offset) < adopted and
+                      not any(record.period_from <= day(offset) <= (record.period_to or datetime.date.max)
+                              for record in adam.foster_records)]
+        intervals = adam.residency_intervals()
+        assert [offset for offset in range(-15, 120)
+                if any(start <= day(offset).toordinal() <= end for start, end in intervals)] == in_shelter
+        assert sum(node.start_animals.count(adam) + node.end_animals.count(adam)
+                   for nodes in shelter._residency.levels for node in nodes.values()) == 2 * len(intervals)
+        assert [offset for offset in range(-15, 120)
+                if adam in shelter._residency.residents(day(offset))] == in_shelter
+        for offset in (-1, 0, 5, 26, 27, 28, 31, 45, 60, 80, 110):
+            assert (adam in shelter.list_animals(day(offset))) == (offset in in_shelter)
+        for offset in range(-15, 120):
+            if offset in in_shelter:
+                assert adam.state(day(offset)) == "in_shelter"
+            elif day(offset) < entry:
+                assert adam.state(day(offset)) is None
+            else:
+                assert adam.state(day(offset)) == ("adopted" if day(offset) >= adopted else "in_foster")
+
+
+def test_occupancy_series():
+    date1, date2, date3, shelter = make_test_shelter()
+    add_foster_parents(shelter)
+    adam = shelter.find_animal('Adam', 2000, 'female', 'rat', 'small')
+    james = shelter.find_animal('James', 1980, 'female', 'rat', 'big')
+    adam.start_foster(datetime.date(2010, 6, 3), shelter.fosters[0])
+    adam.end_foster(datetime.date(2010, 6, 4))
+    james.adopt(datetime.date(2010, 6, 4), 'Patrick', 'Prague')
+
+    start = datetime.date(2010, 5, 31)
+    series = shelter.occupancy_series(start, datetime.date(2010, 6, 6))
+    assert len(series) == 7
+    for when, counts in series:
+        animals = [animal for animal in shelter.animals if animal.date_of_entry <= when]
+        adopted = [animal for animal in animals if animal.adopter is not None and animal.adopter[1] <= when]
+        in_shelter = [animal for animal in animals if animal.check_if_is_in_shelter(when)]
+        assert counts == {"in_shelter": len(in_shelter), "in_foster": len(animals) - len(adopted) - len(in_shelter),
+                          "adopted": len(adopted)}
+    assert series[4] == (datetime.date(2010, 6, 4), {"in_shelter": 0, "in_foster": 1, "adopted": 1})
+
+    series = shelter.occupancy_series(start, date1, step=365, group_by='species')
+    assert [when for when, _ in series][:2] == [start, datetime.date(2011, 5, 31)]
+    assert series[-1][1] == {"rat": {"in_shelter": 1, "in_foster": 0, "adopted": 1},
+                             "dog": {"in_shelter": 0, "in_foster": 0, "adopted": 0}}
+
+    try:
+        shelter.occupancy_series(start, date1, group_by='adopter')
+        raise AssertionError()
+    except RuntimeError:
+        pass
+
+
+def test_iter_animals():
+    date1, date2, date3, shelter = make_test_shelter()
+    for index in range(10):
+        shelter.add_animal('Cat' + str(index), 2000, 'male', date2 + datetime.timedelta(days=index), 'cat', 'any')
+
+    query = shelter.iter_animals(date1)
+    assert list(query) == shelter.list_animals(date1)
+    assert query.count() == 13
+    assert [animal.name for animal in query.first(3)] == ['Adam', 'Cat0', 'Cat1']
+    assert query.page(1, 2) == query.first(3)[1:]
+    assert query.page(12, 5)[0].name == 'Marry'
+    assert query.page(20, 5) == []
+
+    query = shelter.iter_animals(date2 + datetime.timedelta(days=4), species='cat', gender='male')
+    assert [animal.name for animal in query] == ['Cat0', 'Cat1', 'Cat2', 'Cat3', 'Cat4']
+    assert shelter.iter_animals(date1, breed='poodle').first() == []
+    assert shelter.iter_animals(date1, name='James').count() == 1
+
+    for arguments in ({"colour": 'black'}, {"breed": 1}):
+        try:
+            shelter.iter_animals(date1, **arguments)
+            raise AssertionError()
+        except RuntimeError:
+            pass
+
+
+def test_result_cache():
+    date1, date2, date3, shelter = make_test_shelter()
+    add_foster_parents(shelter)
+    shelter.cache_clear()
+    animals = shelter.list_animals(date1, species='rat')
+    animals.pop()
+    assert len(shelter.list_animals(date1, species='rat')) == 2
+    shelter.list_animals(date1)
+    shelter.list_animals(date1)
+    assert shelter.cache_info() == {"hits": 2, "misses": 2, "maxsize": 256, "currsize": 2}
+
+    fosters = shelter.available_foster_parents(date1)
+    shelter.fosters.append(Foster('Eva', 'Brno', '111', 1))
+    assert shelter.available_foster_parents(date1) == fosters + [shelter.fosters[-1]]
+    max_animals = shelter.fosters[0].max_animals
+    shelter.fosters[0].max_animals = 0
+    assert shelter.fosters[0] not in shelter.available_foster_parents(date1)
+    shelter.fosters.pop()
+    shelter.fosters[0].max_animals = max_animals
+
+    adam = shelter.find_animal('Adam', 2000, 'female', 'rat', 'small')
+    mutations = [lambda: shelter.add_animal('Rex', 2001, 'male', date2, 'dog', 'husky'),
+                 lambda: shelter.add_foster_parent('Eva', 'Brno', '111', 1),
+                 lambda: adam.start_foster(date1, shelter.fosters[0]),
+                 lambda: adam.end_foster(date1),
+                 lambda: adam.add_exam('Jan', datetime.date(2019, 1, 1), 'Teeth.'),
+                 lambda: adam.adopt(datetime.date(2019, 2, 1), 'Patrick', 'Prague')]
+    when = datetime.date(2019, 6, 1)
+    for mutation in mutations:
+        version = shelter.version
+        before = (shelter.list_animals(when), shelter.available_foster_parents(date1))
+        mutation()
+        assert shelter.version > version
+        after = (shelter.list_animals(when), shelter.available_foster_parents(date1))
+        assert after == ([animal for animal in shelter.animals if animal.check_if_is_in_shelter(when)],
+                         [foster for foster in shelter.fosters if foster.has_capacity(date1)])
+    assert before != after
+
+    shelter.cache_maxsize = 2
+    for day in range(1, 5):
+        shelter.list_animals(datetime.date(2019, 1, day))
+    assert shelter.cache_info()["currsize"] == 2
+    hits = shelter.cache_info()["hits"]
+    shelter.list_animals(datetime.date(2019, 1, 4))
+    shelter.list_animals(datetime.date(2019, 1, 1))
+    assert shelter.cache_info()["hits"] == hits + 1
+
+
+def test_stats():
+    date1, date2, date3, shelter = make_test_shelter()
+    add_foster_parents(shelter)
+    adam = shelter.find_animal('Adam', 2000, 'female', 'rat', 'small')
+    james = shelter.find_animal('James', 1980, 'female', 'rat', 'big')
+    marry = shelter.find_animal('Marry', 1999, 'male', 'dog', 'labrador')
+    adam.start_foster(datetime.date(2011, 1, 1), shelter.fosters[0])
+    adam.end_foster(datetime.date(2011, 1, 10))
+    adam.start_foster(datetime.date(2012, 1, 1), shelter.fosters[0])
+    adam.end_foster(datetime.date(2012, 1, 20))
+    adam.add_exam('Jan', datetime.date(2012, 6, 1), 'Teeth.')
+    adam.adopt(datetime.date(2013, 6, 1), 'Patrick', 'Prague')
+    james.adopt(datetime.date(2010, 6, 12), 'Henry', 'Paris')
+    marry.add_exam('Jan', datetime.date(2019, 1, 1), 'Paw.')
+    marry.add_exam('Jan', datetime.date(2020, 1, 1), 'Paw again.')
+
+    result = shelter.stats()[None]
+    assert result["length_of_stay"] == {"count": 2, "min": 10, "median": 553, "mean": 553, "max": 1096}
+    assert result["adoption_rate"] == 2 / 3
+    assert result["foster_episode_duration"] == {"count": 2, "mean": 15}
+    assert result["exams_per_animal"] == 1
+
+    result = shelter.stats(["adoption_rate", "exams_per_animal"], group_by='species')
+    assert result == {"rat": {"adoption_rate": 1, "exams_per_animal": 0.5},
+                      "dog": {"adoption_rate": 0, "exams_per_animal": 2}}
+
+    result = shelter.stats(start=datetime.date(2012, 1, 1), end=datetime.date(2019, 6, 1))
+    assert set(result[None]) == set(STATISTICS)
+    assert result[None]["length_of_stay"]["count"] == 1 and result[None]["adoption_rate"] == 1 / 2
+    assert result[None]["foster_episode_duration"] == {"count": 1, "mean": 20}
+    assert result[None]["exams_per_animal"] == 1
+    assert shelter.stats(end=datetime.date(2009, 1, 1)) == {}
+
+    try:
+        shelter.stats(["weight"])
+        raise AssertionError()
+    except RuntimeError:
+        pass
+
+
 def test_exam_basic():
     date1, date2, date3, shelter = make_test_shelter()
     date_ex1 = datetime.date(2019, 6, 1)
@@ -355,6 +1519,57 @@ def test_exam_basic():
     assert animals_ex[0].report == 'Bald spot in fur examined.'
 
 
+def test_exam_order():
+    date1, date2, date3, shelter = make_test_shelter()
+    adam = shelter.find_animal('Adam', 2000, 'female', 'rat', 'small')
+    for day in (20, 5, 12, 5, 30):
+        adam.add_exam('Vet ' + str(day), datetime.date(2011, 1, day), 'Exam.')
+    adam.add_exam('Late', datetime.date(2011, 1, 5), 'Second exam.')
+
+    assert [record.vet for record in adam.veterinary_records] == ['Vet 5', 'Vet 5', 'Late', 'Vet 12', 'Vet 20',
+                                                                  'Vet 30']
+    assert [record.vet for record in adam.list_exams(datetime.date(2011, 1, 5), datetime.date(2011, 1, 12))] == \
+           ['Vet 5', 'Vet 5', 'Late', 'Vet 12']
+    assert adam.list_exams(datetime.date(2011, 1, 13), datetime.date(2011, 1, 19)) == []
+    assert len(adam.list_exams(None, datetime.date(2011, 1, 4))) == 0
+    assert len(adam.list_exams(datetime.date(2011, 1, 20), None)) == 2
+    assert adam.list_exams(None, None) is not adam.veterinary_records
+
+    adam.veterinary_records = [VetRecord('B', datetime.date(2012, 1, 2), 'x'), VetRecord('A', date2, 'y')]
+    assert [record.vet for record in adam.list_exams(date2, None)] == ['A', 'B']
+
+
+def test_shelter_exams():
+    date1, date2, date3, shelter = make_test_shelter()
+    adam = shelter.find_animal('Adam', 2000, 'female', 'rat', 'small')
+    james = shelter.find_animal('James', 1980, 'female', 'rat', 'big')
+    marry = shelter.find_animal('Marry', 1999, 'male', 'dog', 'labrador')
+    adam.add_exam('Jan', datetime.date(2019, 3, 10), 'Teeth.')
+    james.add_exam('Jan', datetime.date(2019, 3, 2), 'Fur.')
+    marry.add_exam('Freddy', datetime.date(2019, 3, 5), 'Paw.')
+    adam.add_exam('Jan', datetime.date(2019, 4, 1), 'Teeth again.')
+    james.add_exam('Jan', datetime.date(2019, 3, 10), 'Ears.')
+
+    march = shelter.list_exams(datetime.date(2019, 3, 1), datetime.date(2019, 3, 31), vet='Jan')
+    assert [(animal.name, record.report) for animal, record in march] == \
+           [('James', 'Fur.'), ('Adam', 'Teeth.'), ('James', 'Ears.')]
+    assert [record.vet for _, record in shelter.iter_exams(datetime.date(2019, 3, 5))] == \
+           ['Freddy', 'Jan', 'Jan', 'Jan']
+    assert shelter.list_exams(vet='Nobody') == []
+    assert len(shelter.list_exams()) == 5
+
+    james.veterinary_records = [VetRecord('Lessie', datetime.date(2019, 3, 3), 'Checked.')]
+    assert [record.report for _, record in shelter.iter_exams(None, datetime.date(2019, 3, 10))] == \
+           ['Checked.', 'Paw.', 'Teeth.']
+    assert shelter.list_exams(vet='Jan', end=datetime.date(2019, 3, 31))[0][0] is adam
+
+    marry.add_exam('Jan', datetime.date(2019, 3, 3), 'Tail.')
+    assert [record.report for _, record in shelter.iter_exams(vet='Jan')] == ['Tail.', 'Teeth.', 'Teeth again.']
+    assert [record.report for _, record in shelter.iter_exams(datetime.date(2019, 3, 3), datetime.date(2019, 3, 3))] \
+           == ['Checked.', 'Tail.']
+    assert shelter.list_exams(datetime.date(2019, 3, 4), datetime.date(2019, 3, 31), vet='Jan')[0][0] is adam
+
+
 def test_adopt_basic():
     date1, date2, date3, shelter = make_test_shelter()
     animals = sorted(shelter.list_animals(date1, species='rat'), key=lambda x: x.name)
@@ -372,6 +1587,141 @@ def test_foster_parents_basic():
     assert fosters[1].phone_number == '123456'
 
 
+def test_foster_load():
+    date1, date2, date3, shelter = make_test_shelter()
+    add_foster_parents(shelter)
+    boris = shelter.fosters[0]
+    animals = shelter.animals
+
+    animals[0].start_foster(datetime.date(2019, 1, 1), boris)
+    animals[1].start_foster(datetime.date(2018, 7, 1), boris, True, datetime.date(2018, 12, 31))
+    animals[2].start_foster(datetime.date(2019, 2, 1), boris)
+    assert [record.period_from for record in boris.foster_records] == \
+           [datetime.date(2018, 7, 1), datetime.date(2019, 1, 1), datetime.date(2019, 2, 1)]
+
+    assert boris.load(datetime.date(2018, 6, 30)) == 0
+    assert boris.load(datetime.date(2018, 12, 31)) == 1
+    assert boris.load(datetime.date(2019, 1, 1)) == 1
+    assert boris.load(datetime.date(2019, 2, 1)) == 2
+    assert boris.has_capacity(datetime.date(2019, 2, 1))
+
+    animals[0].end_foster(datetime.date(2019, 3, 1))
+    assert boris.load(datetime.date(2019, 3, 1)) == 2
+    assert boris.load(datetime.date(2019, 3, 2)) == 1
+    assert shelter.amount_of_animals_in_care(boris, datetime.date(2019, 3, 2)) == 1
+
+    animals[0].start_foster(datetime.date(2019, 4, 1), boris)
+    animals[1].start_foster(datetime.date(2019, 4, 1), boris)
+    assert not boris.has_capacity(datetime.date(2019, 4, 1))
+    assert boris not in shelter.available_foster_parents(datetime.date(2019, 4, 1))
+    assert boris in shelter.available_foster_parents(datetime.date(2019, 3, 31))
+
+
+def test_foster_timeline():
+    date1, date2, date3, shelter = make_test_shelter()
+    add_foster_parents(shelter)
+    boris, lena, roman = shelter.fosters
+    animals = shelter.animals
+
+    animals[0].start_foster(datetime.date(2019, 1, 1), boris, True, datetime.date(2019, 1, 31))
+    animals[1].start_foster(datetime.date(2019, 1, 15), boris, True, datetime.date(2019, 2, 15))
+    animals[2].start_foster(datetime.date(2019, 1, 31), boris)
+    lena.max_animals = 2
+    animals[0].start_foster(datetime.date(2019, 3, 1), lena, True, datetime.date(2019, 3, 1))
+
+    assert boris.timeline() == [(datetime.date(2019, 1, 1), 1), (datetime.date(2019, 1, 15), 2),
+                                (datetime.date(2019, 1, 31), 3), (datetime.date(2019, 2, 1), 2),
+                                (datetime.date(2019, 2, 16), 1)]
+    assert boris.max_load(datetime.date(2018, 1, 1), datetime.date(2018, 12, 31)) == 0
+    assert boris.max_load(datetime.date(2018, 1, 1), datetime.date(2019, 1, 30)) == 2
+    assert boris.max_load(datetime.date(2019, 1, 31), datetime.date(2019, 1, 31)) == 3
+    assert boris.free_slots(datetime.date(2019, 2, 1), datetime.date(2020, 1, 1)) == 1
+    assert boris.free_slots(datetime.date(2019, 1, 1), datetime.date(2020, 1, 1)) == 0
+    assert lena.free_slots(datetime.date(2019, 2, 1), datetime.date(2019, 3, 1)) == 1
+
+    fosters = shelter.available_foster_parents_between(datetime.date(2019, 1, 1), datetime.date(2019, 12, 31))
+    assert fosters == [lena]
+    fosters = shelter.available_foster_parents_between(datetime.date(2019, 2, 16), datetime.date(2019, 12, 31))
+    assert fosters == [boris, lena]
+
+    animals[2].end_foster(datetime.date(2019, 6, 1))
+    assert boris.timeline()[-1] == (datetime.date(2019, 6, 2), 0)
+
+    try:
+        boris.free_slots(datetime.date(2019, 2, 16), datetime.date(2019, 1, 1))
+        raise AssertionError()
+    except RuntimeError:
+        pass
+
+
+def test_foster_batch():
+    date1, date2, date3, shelter = make_test_shelter()
+    add_foster_parents(shelter)
+    boris, lena, roman = shelter.fosters
+    eva = shelter.add_foster_parent('Eva', 'Brno', '111', 2)
+    pets = shelter.add_animals([('Pet' + str(index), 2010, 'male', date2, 'cat', 'any') for index in range(5)])
+    pets[0].start_foster(date1, boris)
+
+    placement = shelter.place_in_foster_batch(pets[1:4], date1)
+    assert [foster for _, foster in placement] == [lena, eva, boris]
+    assert [pet.check_if_is_in_shelter(date1) for pet in pets] == [False, False, False, False, True]
+    assert boris.load(date1) == 2 and lena.load(date1) == 1 and eva.load(date1) == 1
+
+    date = datetime.date(2019, 1, 1)
+    for pet in pets[:4]:
+        pet.end_foster(datetime.date(2018, 12, 31))
+    placement = shelter.place_in_foster_batch(pets, date, policy="fill_first")
+    assert [foster for _, foster in placement] == [boris, boris, boris, lena, eva]
+
+    date = datetime.date(2020, 1, 1)
+    for pet in pets:
+        pet.end_foster(datetime.date(2019, 12, 31))
+    placement = shelter.place_in_foster_batch(pets, date, policy="round_robin")
+    assert [foster for _, foster in placement] == [boris, lena, eva, boris, eva]
+
+    for animals, policy in ((pets[:1], "least_loaded"), (pets[:1], "random"), ([shelter.animals[0]] * 2, "fill_first"),
+                            (shelter.animals, "round_robin")):
+        try:
+            shelter.place_in_foster_batch(animals, date, policy)
+            raise AssertionError()
+        except RuntimeError:
+            pass
+    assert boris.load(date) == 2
+
+
+def test_animal_state():
+    date1, date2, date3, shelter = make_test_shelter()
+    add_foster_parents(shelter)
+    boris, lena, roman = shelter.fosters
+    adam = shelter.find_animal('Adam', 2000, 'female', 'rat', 'small')
+    assert adam.open_foster_record is None
+    assert adam.state(datetime.date(2010, 5, 31)) is None and adam.state(date2) == "in_shelter"
+
+    adam.start_foster(datetime.date(2011, 1, 1), boris)
+    first = adam.open_foster_record
+    adam.start_foster(datetime.date(2012, 1, 1), lena, True)
+    assert adam.open_foster_record is first
+    assert adam.state(datetime.date(2011, 6, 1)) == "in_foster"
+
+    adam.end_foster(datetime.date(2011, 6, 30))
+    assert first.period_to == datetime.date(2011, 6, 30) and adam.open_foster_record.foster is lena
+    assert adam.state(datetime.date(2011, 7, 1)) == "in_shelter"
+    assert not adam.check_if_is_in_shelter(datetime.date(2012, 1, 1))
+
+    adam.end_foster(datetime.date(2012, 2, 1))
+    assert adam.open_foster_record is None
+    adam.adopt(datetime.date(2013, 1, 1), 'Patrick', 'Prague')
+    assert [adam.state(datetime.date(year, 1, 1)) for year in (2012, 2013, 2050)] == \
+           ["in_foster", "adopted", "adopted"]
+    assert adam.check_if_is_in_shelter(datetime.date(2012, 12, 31))
+
+    try:
+        adam.end_foster(datetime.date(2013, 1, 1))
+        raise AssertionError()
+    except RuntimeError:
+        pass
+
+
 def test_foster_care_basic():
     date1, date2, date3, shelter = make_test_shelter()
     animals = sorted(shelter.list_animals(date1, species='rat'), key=lambda x: x.name)
@@ -451,6 +1801,26 @@ def test_exam_error():
         pass
 
 
+def test_foster_unknown_parent():
+    date1, date2, date3, shelter = make_test_shelter()
+    add_foster_parents(shelter)
+    other = Shelter()
+    stranger = other.add_foster_parent('Boris', 'New York', '12345', 3)
+    animal = shelter.animals[0]
+
+    try:
+        animal.start_foster(date1, stranger)
+        raise AssertionError()
+    except RuntimeError:
+        pass
+    assert animal.foster_records is None
+
+    outsider = Foster('Olga', 'Kyiv', '999', 1)
+    shelter.fosters.append(outsider)
+    animal.start_foster(date1, outsider)
+    assert shelter.amount_of_animals_in_care(outsider, date1) == 1
+
+
 def test_foster_cap_exceeded():
     date1, date2, date3, shelter = make_test_shelter()
     animals = sorted(shelter.list_animals(date1, species='rat'), key=lambda x: x.name)
@@ -484,15 +1854,32 @@ def test_sanity_fail():
 
 def test_main_shelter():
     test_add_animal()
+    test_add_animal_duplicates()
+    test_bulk_add()
+    test_sql_id_lookup()
     test_list_animals_basic()
+    test_list_animals_filters()
+    test_residency_index()
+    test_residency_updates()
+    test_occupancy_series()
+    test_iter_animals()
+    test_result_cache()
+    test_stats()
     test_exam_basic()
+    test_exam_order()
+    test_shelter_exams()
     test_adopt_basic()
     test_foster_parents_basic()
     test_foster_care_basic()
+    test_foster_load()
+    test_foster_timeline()
+    test_foster_batch()
+    test_animal_state()
     test_foster_care_error()
     test_adoption_foster_error()
     test_exam_error()
     test_foster_cap_exceeded()
+    test_foster_unknown_parent()
     test_sanity_fail()
 
 
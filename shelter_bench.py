@@ -0,0 +1,200 @@
+import datetime
+import importlib.util
+import sqlite3
+import sys
+import time
+import tracemalloc
+
+import shelter_columnar
+import shelter_json
+import shelter_sql
+from shelter import *
+
+
+def traced(build):
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    result = build()
+    used = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    return used, result
+
+
+def make_animal_rows(amount):
+    entry = datetime.date(2000, 1, 1)
+    return [("Animal" + str(index), 1990 + index % 30, ("male", "female")[index % 2],
+             entry + datetime.timedelta(days=index % 3650), ("dog", "cat", "rat")[index % 3], "Breed" + str(index % 50))
+            for index in range(amount)]
+
+
+def load_shelter_module(path):
+    # Another revision of shelter.py, e.g. from "git show <commit>:shelter.py > /tmp/shelter_before.py".
+    spec = importlib.util.spec_from_file_location("shelter_baseline", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def benchmark_memory(animals=20000, exams_per_animal=10, fosters_per_animal=2, shelter_module=None):
+    # Deterministic shelter, every phase reports bytes allocated per created object.
+    # Only the original Shelter API is used, so older revisions of shelter.py can be measured as well.
+    shelter = (shelter_module.Shelter if shelter_module is not None else Shelter)()
+    rows = make_animal_rows(animals)
+    for index in range(100):
+        shelter.add_foster_parent("Foster" + str(index), "Street " + str(index), str(index), animals)
+    fosters = list(shelter.fosters)
+    exam_dates = [datetime.date(2012, 1, 1) + datetime.timedelta(days=index) for index in range(exams_per_animal)]
+    foster_dates = [(datetime.date(2013, 1, 1) + datetime.timedelta(days=30 * index),
+                     datetime.date(2013, 1, 20) + datetime.timedelta(days=30 * index))
+                    for index in range(fosters_per_animal)]
+
+    animal_bytes, added = traced(lambda: [shelter.add_animal(*row) for row in rows])
+
+    def add_exams():
+        for animal in added:
+            for exam_date in exam_dates:
+                animal.add_exam("Vet", exam_date, "Routine exam.")
+
+    def add_foster_records():
+        for index, animal in enumerate(added):
+            for period_from, period_to in foster_dates:
+                animal.start_foster(period_from, fosters[index % len(fosters)], True, period_to)
+
+    exam_bytes, _ = traced(add_exams)
+    foster_bytes, _ = traced(add_foster_records)
+    return {"animal": animal_bytes / animals,
+            "vet record": exam_bytes / (animals * exams_per_animal),
+            "foster record": foster_bytes / (animals * fosters_per_animal)}
+
+
+def timed(run):
+    start = time.perf_counter()
+    result = run()
+    return time.perf_counter() - start, result
+
+
+def benchmark_residency(animals=20000, queries=100, shelter_module=None):
+    # Unfiltered list_animals on distinct dates, alone and with a start_foster before every query.
+    # Only the original Shelter API is used, so older revisions of shelter.py can be measured as well.
+    shelter = (shelter_module.Shelter if shelter_module is not None else Shelter)()
+    for index in range(50):
+        shelter.add_foster_parent("Foster" + str(index), "Street " + str(index), str(index), animals)
+    fosters = list(shelter.fosters)
+    added = [shelter.add_animal(*row) for row in make_animal_rows(animals)]
+    for index, animal in enumerate(added):
+        entry = animal.date_of_entry
+        if index % 3 == 0:
+            animal.start_foster(entry + datetime.timedelta(days=30), fosters[index % len(fosters)], True,
+                                entry + datetime.timedelta(days=90))
+        if index % 5 == 0:
+            animal.adopt(entry + datetime.timedelta(days=400 + index % 900), "Adopter", "Street")
+
+    dates = [datetime.date(2000, 1, 1) + datetime.timedelta(days=47 * index) for index in range(queries)]
+    query_time, _ = timed(lambda: [shelter.list_animals(date) for date in dates])
+
+    def query_after_change():
+        for index, date in enumerate(dates):
+            start = datetime.date(2020, 1, 1) + datetime.timedelta(days=index)
+            added[index * 7919 % animals].start_foster(start, fosters[index % len(fosters)], True, start)
+            shelter.list_animals(date)
+
+    changing_time, _ = timed(query_after_change)
+    return {"query": query_time / queries, "start_foster and query": changing_time / queries}
+
+
+def benchmark_columnar(animals=1000000):
+    shelter = Shelter()
+    shelter.add_animals(make_animal_rows(animals))
+    when = datetime.date(2005, 1, 1)
+
+    walk_time, walked = timed(lambda: [animal for animal in shelter.animals
+                                       if animal.species == "dog" and animal.check_if_is_in_shelter(when)])
+    export_time, columnar = timed(lambda: shelter_columnar.to_columnar(shelter))
+    query_time, queried = timed(lambda: columnar.list_animals(when, species="dog"))
+    if walked != queried:
+        raise RuntimeError("Columnar query doesn't match object walk.")
+    return {"object walk": walk_time, "columnar export": export_time, "columnar query": query_time}
+
+
+def make_history_shelter(animals):
+    # Exams and foster episodes reuse about two thousand distinct dates, like real datasets.
+    shelter = Shelter()
+    fosters = [shelter.add_foster_parent("Foster" + str(index), "Street " + str(index), str(index), animals)
+               for index in range(50)]
+    for index, animal in enumerate(shelter.add_animals(make_animal_rows(animals))):
+        base = datetime.date(2010, 1, 1) + datetime.timedelta(days=index % 1000)
+        for exam in range(5):
+            animal.add_exam("Vet" + str(exam), base + datetime.timedelta(days=30 * exam), "Routine exam.")
+        animal.start_foster(base + datetime.timedelta(days=200), fosters[index % len(fosters)], True,
+                            base + datetime.timedelta(days=260))
+        animal.start_foster(base + datetime.timedelta(days=300), fosters[index % len(fosters)], True,
+                            base + datetime.timedelta(days=320))
+    return shelter
+
+
+def round_trip(shelter):
+    def run_json():
+        shelter_json.load(shelter_json.store(shelter.animals), shelter_json.store(shelter.fosters))
+
+    def run_sql():
+        db = sqlite3.connect(":memory:")
+        shelter_sql.load(shelter_sql.store(shelter, db), db)
+        db.close()
+
+    return timed(run_json)[0], timed(run_sql)[0]
+
+
+def benchmark_dates(animals=2000):
+    shelter = make_history_shelter(animals)
+    cached = round_trip(shelter)
+    modules = (shelter_json, shelter_sql)
+    for module in modules:
+        module.parse_date = parse_date.__wrapped__
+        module.format_date = format_date.__wrapped__
+    try:
+        uncached = round_trip(shelter)
+    finally:
+        for module in modules:
+            module.parse_date = parse_date
+            module.format_date = format_date
+    return {"json store and load": (uncached[0], cached[0]), "sql store and load": (uncached[1], cached[1])}
+
+
+def print_results(results, baseline=None, baseline_path=None, scale=1, digits=1):
+    # With a baseline every line shows baseline -> current and how many times the current figure is the baseline.
+    for name, value in results.items():
+        if baseline is None:
+            print("  " + name + ":", round(value * scale, digits))
+        else:
+            print("  " + name + ":", round(baseline[name] * scale, digits), "(" + baseline_path + ") ->",
+                  round(value * scale, digits), "(" + str(round(value / baseline[name], 2)) + "x)")
+
+
+def run_benchmarks(animals=20000, history_animals=2000, baseline_path=None):
+    baseline_module = load_shelter_module(baseline_path) if baseline_path is not None else None
+
+    print("Memory usage with", animals, "animals, bytes per object:")
+    print_results(benchmark_memory(animals),
+                  benchmark_memory(animals, shelter_module=baseline_module) if baseline_module is not None else None,
+                  baseline_path)
+
+    print("Unfiltered list_animals with", animals, "animals, ms per query:")
+    print_results(benchmark_residency(animals),
+                  benchmark_residency(animals, shelter_module=baseline_module) if baseline_module is not None else None,
+                  baseline_path, 1000, 2)
+
+    print("Date parsing cache with", history_animals, "animals:")
+    for name, (uncached, cached) in benchmark_dates(history_animals).items():
+        print("  " + name + ":", round(uncached, 3), "s without cache,", round(cached, 3), "s with cache")
+
+    if shelter_columnar.numpy is not None:
+        print("Filtered residency query with", animals, "animals:")
+        for name, seconds in benchmark_columnar(animals).items():
+            print("  " + name + ":", round(seconds, 4), "s")
+
+
+if __name__ == '__main__':
+    # python shelter_bench.py [animals] [older shelter.py to compare memory usage and residency queries with],
+    # e.g. the tree before the indexes to see what the series costs and saves overall.
+    run_benchmarks(int(sys.argv[1]) if len(sys.argv) > 1 else 20000,
+                   baseline_path=sys.argv[2] if len(sys.argv) > 2 else None)
@@ -0,0 +1,140 @@
+import datetime
+import unittest
+
+from shelter import *
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+CATEGORICAL_ATTRIBUTES = ("name", "gender", "species", "breed")
+
+NEVER = MAX_ORDINAL + 1
+
+
+class ColumnarShelter:
+    # Read-only column snapshot of a shelter, rows follow the order of Shelter.animals.
+    def __init__(self, shelter):
+        if numpy is None:
+            raise RuntimeError("Columnar shelter requires NumPy.")
+        self.animals = list(shelter.animals)
+        size = len(self.animals)
+
+        self.categories = {}
+        self.columns = {}
+        for attribute in CATEGORICAL_ATTRIBUTES:
+            codes = {}
+            self.columns[attribute] = numpy.fromiter(
+                (codes.setdefault(getattr(animal, attribute), len(codes)) for animal in self.animals),
+                dtype=numpy.int32, count=size)
+            self.categories[attribute] = codes
+
+        self.columns["year_of_birth"] = numpy.fromiter((animal.year_of_birth for animal in self.animals),
+                                                       dtype=numpy.int64, count=size)
+        self.columns["date_of_entry"] = numpy.fromiter((animal.date_of_entry.toordinal() for animal in self.animals),
+                                                       dtype=numpy.int64, count=size)
+        self.adoption = numpy.fromiter((animal.adopter[1].toordinal() if animal.adopter is not None else NEVER
+                                        for animal in self.animals), dtype=numpy.int64, count=size)
+
+        record_animal = []
+        record_from = []
+        record_to = []
+        for row, animal in enumerate(self.animals):
+            for record in (animal.foster_records if animal.foster_records is not None else []):
+                period_from, period_to = record.ordinal_bounds()
+                record_animal.append(row)
+                record_from.append(period_from)
+                record_to.append(period_to)
+        self.record_animal = numpy.array(record_animal, dtype=numpy.int64)
+        self.record_from = numpy.array(record_from, dtype=numpy.int64)
+        self.record_to = numpy.array(record_to, dtype=numpy.int64)
+
+    def __len__(self):
+        return len(self.animals)
+
+    def in_shelter_mask(self, date):
+        try_argument(date, datetime.date)
+        point = date.toordinal()
+        mask = (self.columns["date_of_entry"] <= point) & (self.adoption > point)
+        active = (self.record_from <= point) & (self.record_to >= point)
+        mask[self.record_animal[active]] = False
+        return mask
+
+    def filter_mask(self, **filters):
+        mask = numpy.ones(len(self.animals), dtype=bool)
+        for attribute, type_value in INDEXED_ATTRIBUTES:
+            value = filters.pop(attribute, None)
+            if value is None:
+                continue
+            try_argument(value, type_value)
+            if attribute in self.categories:
+                code = self.categories[attribute].get(value)
+                if code is None:
+                    return numpy.zeros(len(self.animals), dtype=bool)
+                mask &= self.columns[attribute] == code
+            elif attribute == "date_of_entry":
+                mask &= self.columns[attribute] == value.toordinal()
+            else:
+                mask &= self.columns[attribute] == value
+        if filters:
+            raise RuntimeError("Unknown filter.")
+        return mask
+
+    def query_mask(self, date, **filters):
+        return self.in_shelter_mask(date) & self.filter_mask(**filters)
+
+    def list_animals(self, date, **filters):
+        return [self.animals[row] for row in numpy.flatnonzero(self.query_mask(date, **filters))]
+
+    def count_animals(self, date, **filters):
+        return int(numpy.count_nonzero(self.query_mask(date, **filters)))
+
+
+def to_columnar(shelter):
+    return ColumnarShelter(shelter)
+
+
+def test_columnar_matches_shelter():
+    if numpy is None:
+        raise unittest.SkipTest("NumPy isn't installed.")
+    shelter = Shelter()
+    date1 = datetime.date(2010, 6, 1)
+    date2 = datetime.date(2012, 6, 1)
+    rex = shelter.add_animal('Rex', 2008, 'male', date1, 'dog', 'labrador')
+    bella = shelter.add_animal('Bella', 2009, 'female', date1, 'dog', 'labrador')
+    shelter.add_animal('Tom', 2005, 'male', date2, 'cat', 'persian')
+    foster = shelter.add_foster_parent('Freddy', 'New York', '09542985248', 3)
+    rex.start_foster(datetime.date(2011, 1, 1), foster)
+    rex.end_foster(datetime.date(2011, 12, 31))
+    bella.adopt(datetime.date(2013, 1, 1), 'Patrick', 'Prague')
+
+    columnar = to_columnar(shelter)
+    dates = [datetime.date(2010, 5, 31), date1, datetime.date(2011, 6, 1), datetime.date(2012, 1, 1), date2,
+             datetime.date(2013, 1, 1)]
+    for when in dates:
+        assert list(columnar.in_shelter_mask(when)) == [animal.check_if_is_in_shelter(when)
+                                                        for animal in shelter.animals]
+        assert columnar.list_animals(when) == shelter.list_animals(when)
+        assert columnar.list_animals(when, breed='labrador') == shelter.list_animals(when, breed='labrador')
+        assert columnar.count_animals(when, species='cat', gender='male') == \
+               len(shelter.list_animals(when, species='cat', gender='male'))
+    assert columnar.list_animals(date2, breed='poodle') == []
+    assert columnar.list_animals(date2, year_of_birth=2005, date_of_entry=date2)[0].name == 'Tom'
+
+    try:
+        columnar.list_animals(date2, colour='black')
+        raise AssertionError()
+    except RuntimeError:
+        pass
+
+
+def test_main_columnar():
+    try:
+        test_columnar_matches_shelter()
+    except unittest.SkipTest as error:
+        print("Skipped test_columnar_matches_shelter:", error)
+
+
+if __name__ == '__main__':
+    test_main_columnar()
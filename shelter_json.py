@@ -1,8 +1,15 @@
+import codecs
+import collections
+import io
+import itertools
 import json
 
 import shelter_sql
 from shelter import *
 
+LOAD_BATCH_SIZE = 1024
+STREAM_CHUNK_SIZE = 65536
+
 
 def store(object_in, convert=False):
     if type(object_in) == Foster:
@@ -19,32 +26,61 @@ def store(object_in, convert=False):
     raise RuntimeError("Function store can accept only Foster or Animal object or list of them.")
 
 
+def dump(object_in, fp):
+    # Same output as store, written one record at a time.
+    if type(object_in) == list:
+        fp.write("[")
+        for index, object_value in enumerate(object_in):
+            if index > 0:
+                fp.write(", ")
+            dump(object_value, fp)
+        fp.write("]")
+        return
+
+    if type(object_in) not in (Foster, Animal):
+        raise RuntimeError("Function dump can accept only Foster or Animal object or list of them.")
+    fp.write(store(object_in))
+
+
+def dump_animals(shelter, fp):
+    dump(shelter.animals, fp)
+
+
+def dump_fosters(shelter, fp):
+    dump(shelter.fosters, fp)
+
+
 def store_foster(foster_object):
+    # Foster.foster_records are sorted by start, equal starts keep the animals_in_care order.
+    positions = {animal: position for position, animal in enumerate(foster_object.animals_in_care)}
+    records = sorted(foster_object.foster_records, key=lambda record: positions[record.animal])
+    records.sort(key=lambda record: record.period_from)
+
+    animal_info = {}
     foster_animals = []
-    for animal in foster_object.animals_in_care:
-        animal_info_dict = {"name": animal.name,
-                            "year_of_birth": animal.year_of_birth,
-                            "gender": animal.gender,
-                            "date_of_entry": str(animal.date_of_entry),
-                            "species": animal.species,
-                            "breed": animal.breed}
-
-        for record in animal.foster_records:
-            if record.foster == foster_object:
-                record_dict = {"start": str(record.period_from),
-                               "end": record.period_to,
-                               "animal": animal_info_dict}
-                if record_dict["end"] is None:
-                    del record_dict["end"]
-                else:
-                    record_dict["end"] = str(record_dict["end"])
-                foster_animals.append(record_dict)
+    for record in records:
+        animal = record.animal
+        if animal not in animal_info:
+            animal_info[animal] = {"name": animal.name,
+                                   "year_of_birth": animal.year_of_birth,
+                                   "gender": animal.gender,
+                                   "date_of_entry": format_date(animal.date_of_entry),
+                                   "species": animal.species,
+                                   "breed": animal.breed}
+        record_dict = {"start": format_date(record.period_from),
+                       "end": record.period_to,
+                       "animal": animal_info[animal]}
+        if record_dict["end"] is None:
+            del record_dict["end"]
+        else:
+            record_dict["end"] = format_date(record_dict["end"])
+        foster_animals.append(record_dict)
 
     foster_dict = {"name": foster_object.name,
                    "capacity": foster_object.max_animals,
                    "address": foster_object.address,
                    "phone": foster_object.phone_number,
-                   "fostering": sorted(foster_animals, key=lambda x: x["start"])}
+                   "fostering": foster_animals}
     return foster_dict
 
 
@@ -53,19 +89,19 @@ def store_animal(animal_object):
     exams = []
     fostering = []
     if animal_object.adopter is not None:
-        adopt_dict = {"date": str(animal_object.adopter[1]),
+        adopt_dict = {"date": format_date(animal_object.adopter[1]),
                       "name": animal_object.adopter[0].name,
                       "address": animal_object.adopter[0].address}
 
     if animal_object.veterinary_records is not None:
         for exam in animal_object.veterinary_records:
             exams.append({"vet": exam.vet,
-                          "date": str(exam.date),
+                          "date": format_date(exam.date),
                           "report": exam.report})
 
     if animal_object.foster_records is not None:
         for foster_rec in animal_object.foster_records:
-            output_dir = {"start": str(foster_rec.period_from),
+            output_dir = {"start": format_date(foster_rec.period_from),
                           "end": foster_rec.period_to,
                           "parent": {"name": foster_rec.foster.name,
                                      "address": foster_rec.foster.address,
@@ -73,13 +109,13 @@ def store_animal(animal_object):
             if output_dir["end"] is None:
                 del output_dir["end"]
             else:
-                output_dir["end"] = str(output_dir["end"])
+                output_dir["end"] = format_date(output_dir["end"])
             fostering.append(output_dir)
 
     animal_dict = {"name": animal_object.name,
                    "year_of_birth": animal_object.year_of_birth,
                    "gender": animal_object.gender,
-                   "date_of_entry": str(animal_object.date_of_entry),
+                   "date_of_entry": format_date(animal_object.date_of_entry),
                    "species": animal_object.species,
                    "breed": animal_object.breed,
                    "adopted": adopt_dict,
@@ -92,130 +128,204 @@ def store_animal(animal_object):
 
 
 def convert_json_to_fosters(shelter, foster_json_data):
-    for foster_data in foster_json_data:
-        shelter.add_foster_parent(foster_data["name"], foster_data["address"], foster_data["phone"],
-                                  foster_data["capacity"])
+    return shelter.add_foster_parents_bulk((foster_data["name"], foster_data["address"], foster_data["phone"],
+                                            foster_data["capacity"]) for foster_data in foster_json_data)
+
+
+def json_to_animal_row(animal_data):
+    return (animal_data["name"],
+            animal_data["year_of_birth"],
+            animal_data["gender"],
+            parse_date(animal_data["date_of_entry"]),
+            animal_data["species"],
+            animal_data["breed"])
 
 
 def convert_json_to_animal(shelter, animal_data, basic=False):
-    animal = shelter.add_animal(animal_data["name"],
-                                animal_data["year_of_birth"],
-                                animal_data["gender"],
-                                datetime.date.fromisoformat(animal_data["date_of_entry"]),
-                                animal_data["species"],
-                                animal_data["breed"])
+    animal = shelter.add_animal(*json_to_animal_row(animal_data))
     if basic:
         return animal
+    return fill_animal_from_json(animal, animal_data)
+
 
+def fill_animal_from_json(animal, animal_data):
     if "adopted" in animal_data:
         animal.adopter = (Adopter(animal_data["adopted"]["name"], animal_data["adopted"]["address"]),
-                          datetime.date.fromisoformat(animal_data["adopted"]["date"]))
+                          parse_date(animal_data["adopted"]["date"]))
 
     if len(animal_data["exams"]) > 0:
         out_exams = []
         for exam in animal_data["exams"]:
-            out_exams.append(VetRecord(exam["vet"], datetime.date.fromisoformat(exam["date"]),
+            out_exams.append(VetRecord(exam["vet"], parse_date(exam["date"]),
                                        exam["report"]))
         animal.veterinary_records = out_exams
     return animal
 
 
 def load_full_shelter(shelter, json_animals, json_foster):
-    foster_json_data = json.loads(json_foster)
-    convert_json_to_fosters(shelter, foster_json_data)
-
-    for animal_data in json.loads(json_animals):
-        animal = convert_json_to_animal(shelter, animal_data)
-        if len(animal_data["fostering"]) > 0:
-            for animal_record in animal_data["fostering"]:
-                for foster in shelter.fosters:
-                    if foster.name == animal_record["parent"]["name"] \
-                            and foster.address == animal_record["parent"]["address"] \
-                            and foster.phone_number == animal_record["parent"]["phone"]:
-                        parent = foster
-                        break
-                else:
-                    raise RuntimeError("Cross-check failed, foster parent wasn't found.")
-
-                for foster_data in foster_json_data:
-                    found = False
-                    if parent.name == foster_data["name"] and parent.address == foster_data["address"] \
-                            and parent.phone_number == foster_data["phone"]:
-                        for foster_record in foster_data["fostering"]:
-                            if animal_record["start"] == foster_record["start"] and \
-                                    (("end" not in animal_record and "end" not in foster_record)
-                                     or animal_record["end"] == foster_record["end"]):
-                                for animal_key in foster_record["animal"]:
-                                    if foster_record["animal"][animal_key] != animal_data[animal_key]:
-                                        break
-                                else:
-                                    foster_data["fostering"].remove(foster_record)
-                                    found = True
-                    if found:
-                        break
-                else:
-                    raise RuntimeError("Cross-check failed, record about care wasn't found in foster parent records.")
-
-                if "end" in animal_record:
-                    animal.start_foster(datetime.date.fromisoformat(animal_record["start"]), parent, True,
-                                        datetime.date.fromisoformat(animal_record["end"]))
-                else:
-                    animal.start_foster(datetime.date.fromisoformat(animal_record["start"]), parent, True)
-
-    for foster_data in foster_json_data:
-        if len(foster_data["fostering"]) > 0:
-            raise RuntimeError("Cross-check failed, leftovers in fosters data.")
+    return load_shelter_data(shelter, json.loads(json_animals), json.loads(json_foster))
+
+
+def iter_batches(items):
+    items = iter(items)
+    while True:
+        batch = list(itertools.islice(items, LOAD_BATCH_SIZE))
+        if len(batch) == 0:
+            return
+        yield batch
+
+
+def load_shelter_data(shelter, animals_json_data, foster_json_data):
+    # Both inputs may be any iterables consumed once, only the care record keys of fosters are kept for the cross-check.
+    pending_records = collections.Counter()
+    for batch in iter_batches(foster_json_data):
+        convert_json_to_fosters(shelter, batch)
+        for foster_data in batch:
+            parent_key = (foster_data["name"], foster_data["address"], foster_data["phone"])
+            for foster_record in foster_data["fostering"]:
+                pending_records[care_record_key(parent_key, foster_record, foster_record["animal"])] += 1
+
+    for batch in iter_batches(animals_json_data):
+        animals = shelter.add_animals(json_to_animal_row(animal_data) for animal_data in batch)
+        for animal, animal_data in zip(animals, batch):
+            load_animal_from_json(shelter, pending_records, animal, animal_data)
+
+    if any(count > 0 for count in pending_records.values()):
+        raise RuntimeError("Cross-check failed, leftovers in fosters data.")
     return shelter
 
 
+def care_record_key(parent_key, record, animal_data):
+    return (parent_key, record["start"], record.get("end"),
+            tuple(animal_data[animal_key] for animal_key in ANIMAL_FIELDS))
+
+
+def load_animal_from_json(shelter, pending_records, animal, animal_data):
+    fill_animal_from_json(animal, animal_data)
+    for animal_record in animal_data["fostering"]:
+        parent_key = (animal_record["parent"]["name"], animal_record["parent"]["address"],
+                      animal_record["parent"]["phone"])
+        parent = shelter.find_foster(*parent_key)
+        if parent is None:
+            raise RuntimeError("Cross-check failed, foster parent wasn't found.")
+
+        record_key = care_record_key(parent_key, animal_record, animal_data)
+        if pending_records[record_key] == 0:
+            raise RuntimeError("Cross-check failed, record about care wasn't found in foster parent records.")
+        pending_records[record_key] -= 1
+
+        if "end" in animal_record:
+            animal.start_foster(parse_date(animal_record["start"]), parent, True,
+                                parse_date(animal_record["end"]))
+        else:
+            animal.start_foster(parse_date(animal_record["start"]), parent, True)
+
+
+class _JsonArrayReader:
+    # Yields the elements of a top-level JSON array, reading the file object chunk by chunk.
+    def __init__(self, fp, chunk_size=STREAM_CHUNK_SIZE):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.bytes_decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+
+    def fill(self, size):
+        chunk = self.fp.read(size)
+        self.eof = len(chunk) == 0
+        if type(chunk) != str:
+            chunk = self.bytes_decoder.decode(chunk, self.eof)
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+
+    def next_char(self):
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in " \t\n\r":
+                self.position += 1
+            if self.position < len(self.buffer) or self.eof:
+                return self.buffer[self.position:self.position + 1]
+            self.fill(self.chunk_size)
+
+    def decode_value(self):
+        self.next_char()
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+                # A value touching the end of the buffer may continue in the next chunk.
+                if end < len(self.buffer) or self.eof:
+                    self.position = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise RuntimeError("Invalid JSON array element.")
+            self.fill(size)
+            size *= 2
+
+    def __iter__(self):
+        if self.next_char() != "[":
+            raise RuntimeError("Expected JSON array.")
+        self.position += 1
+        if self.next_char() == "]":
+            self.position += 1
+        else:
+            while True:
+                yield self.decode_value()
+                separator = self.next_char()
+                self.position += 1
+                if separator == "]":
+                    break
+                if separator != ",":
+                    raise RuntimeError("Invalid JSON array.")
+        if self.next_char() != "":
+            raise RuntimeError("Unexpected data after JSON array.")
+
+
+def iter_json_array(fp, chunk_size=STREAM_CHUNK_SIZE):
+    return iter(_JsonArrayReader(fp, chunk_size))
+
+
+def load_stream(animals_fp, fosters_fp):
+    return load_shelter_data(Shelter(), iter_json_array(animals_fp), iter_json_array(fosters_fp))
+
+
 def get_foster_with_fake_animals(shelter, json_foster):
     foster_json_data = json.loads(json_foster)
-    shelter.add_foster_parent(foster_json_data["name"], foster_json_data["address"], foster_json_data["phone"],
-                              foster_json_data["capacity"])
+    foster = shelter.add_foster_parent(foster_json_data["name"], foster_json_data["address"],
+                                       foster_json_data["phone"], foster_json_data["capacity"])
     if len(shelter.fosters) != 1:
         raise RuntimeError("Invalid shelter structure.")
 
     for foster_record in foster_json_data["fostering"]:
-        for existing_animal in shelter.animals:
-            if existing_animal.name == foster_record["animal"]["name"] and \
-                    existing_animal.year_of_birth == foster_record["animal"]["year_of_birth"] \
-                    and existing_animal.gender == foster_record["animal"]["gender"] \
-                    and existing_animal.date_of_entry == foster_record["animal"]["date_of_entry"] \
-                    and existing_animal.species == foster_record["animal"]["species"] \
-                    and existing_animal.breed == foster_record["animal"]["breed"]:
-                fake_animal = existing_animal
-                break
-        else:
-            fake_animal = convert_json_to_animal(shelter, foster_record["animal"], True)
-
+        # Animals already created for an earlier record are found through the shelter identity index.
+        fake_animal = convert_json_to_animal(shelter, foster_record["animal"], True)
         if "end" in foster_record:
-            fake_animal.start_foster(datetime.date.fromisoformat(foster_record["start"]), shelter.fosters[0], True,
-                                     datetime.date.fromisoformat(foster_record["end"]))
+            fake_animal.start_foster(parse_date(foster_record["start"]), foster, True,
+                                     parse_date(foster_record["end"]))
         else:
-            fake_animal.start_foster(datetime.date.fromisoformat(foster_record["start"]), shelter.fosters[0], True)
-    return shelter.fosters[0]
+            fake_animal.start_foster(parse_date(foster_record["start"]), foster, True)
+    return foster
 
 
 def get_animal_with_fake_fosters(shelter, json_animal):
     animal_data = json.loads(json_animal)
     animal = convert_json_to_animal(shelter, animal_data)
     for foster_record in animal_data["fostering"]:
-        for foster in shelter.fosters:
-            if foster.name == foster_record["parent"]["name"] and foster.address == foster_record["parent"]["address"] \
-                    and foster.phone_number == foster_record["parent"]["phone"]:
-                fake_foster = foster
-                break
-        else:
+        fake_foster = shelter.find_foster(foster_record["parent"]["name"], foster_record["parent"]["address"],
+                                          foster_record["parent"]["phone"])
+        if fake_foster is None:
             fake_foster = Foster(foster_record["parent"]["name"],
                                  foster_record["parent"]["address"],
                                  foster_record["parent"]["phone"])
-            shelter.fosters.append(fake_foster)
+            shelter.register_foster(fake_foster)
 
         if "end" in foster_record:
-            animal.start_foster(datetime.date.fromisoformat(foster_record["start"]), fake_foster, True,
-                                datetime.date.fromisoformat(foster_record["end"]))
+            animal.start_foster(parse_date(foster_record["start"]), fake_foster, True,
+                                parse_date(foster_record["end"]))
         else:
-            animal.start_foster(datetime.date.fromisoformat(foster_record["start"]), fake_foster, True)
+            animal.start_foster(parse_date(foster_record["start"]), fake_foster, True)
     return animal
 
 
@@ -328,8 +438,139 @@ def test_failXY():
         pass
 
 
+def test_json_dump():
+    date1, date2, date3, shelter = make_test_shelterX()
+    animal = shelter.list_animals(date3)[0]
+    animal.add_exam('Pro Care', datetime.date(2020, 9, 6), 'Thorough entrance exam.')
+    animal.start_foster(datetime.date(2000, 9, 6), shelter.fosters[0])
+    animal.end_foster(datetime.date(2001, 9, 5))
+    animal.start_foster(datetime.date(2004, 9, 6), shelter.fosters[0])
+
+    for object_in in (shelter.animals, shelter.fosters, [], animal, shelter.fosters[0]):
+        output = io.StringIO()
+        dump(object_in, output)
+        assert output.getvalue() == store(object_in)
+
+    animals_output = io.StringIO()
+    fosters_output = io.StringIO()
+    dump_animals(shelter, animals_output)
+    dump_fosters(shelter, fosters_output)
+    assert store(load(animals_output.getvalue(), fosters_output.getvalue()).animals) == store(shelter.animals)
+
+    try:
+        dump([animal, "Rex"], io.StringIO())
+        raise AssertionError()
+    except RuntimeError:
+        pass
+
+
+def test_json_load_stream():
+    date1, date2, date3, shelter = make_test_shelterX()
+    animal = shelter.list_animals(date3)[0]
+    animal.add_exam('Pro Čare', datetime.date(2020, 9, 6), 'Thorough entrance exam.')
+    animal.start_foster(datetime.date(2000, 9, 6), shelter.fosters[0])
+    animal.end_foster(datetime.date(2001, 9, 5))
+    animal.start_foster(datetime.date(2004, 9, 6), shelter.fosters[1])
+    json_animals = store(shelter.animals)
+    json_fosters = store(shelter.fosters)
+
+    loaded = load_stream(io.StringIO(json_animals), io.StringIO(json_fosters))
+    assert store(loaded.animals) == json_animals and store(loaded.fosters) == json_fosters
+
+    # Tiny chunks split multi-byte characters and values across reads.
+    for chunk_size in (1, 2, 7):
+        elements = list(iter_json_array(io.BytesIO(json_animals.encode()), chunk_size))
+        assert elements == json.loads(json_animals)
+        assert list(iter_json_array(io.StringIO(" [ 12 , 345,\n6 ] "), chunk_size)) == [12, 345, 6]
+    assert list(iter_json_array(io.StringIO("[]"))) == []
+
+    for invalid in ("", "{}", "[1, 2", "[1 2]", "[1, {]", "[1] 2"):
+        try:
+            list(iter_json_array(io.StringIO(invalid), 2))
+            raise AssertionError()
+        except RuntimeError:
+            pass
+
+    animal_data = json.loads(json_animals)
+    animal_data[shelter.animals.index(animal)]["fostering"] = []
+    try:
+        load_stream(io.StringIO(json.dumps(animal_data)), io.StringIO(json_fosters))
+        raise AssertionError()
+    except RuntimeError:
+        pass
+
+
+def test_json_cross_check():
+    date1, date2, date3, shelter = make_test_shelterX()
+    animal = shelter.list_animals(date3)[0]
+    animal.start_foster(datetime.date(2000, 9, 6), shelter.fosters[0])
+    animal.end_foster(datetime.date(2001, 9, 5))
+    animal.start_foster(datetime.date(2004, 9, 6), shelter.fosters[0])
+    json_animals = store(shelter.animals)
+    json_fosters = store(shelter.fosters)
+    assert store(load(json_animals, json_fosters).animals) == json_animals
+
+    position = shelter.animals.index(animal)
+    changes = [lambda animals, fosters: animals[position]["fostering"].pop(),
+               lambda animals, fosters: fosters[0]["fostering"].pop(),
+               lambda animals, fosters: animals[position]["fostering"][0].update(end="2001-09-04"),
+               lambda animals, fosters: fosters[0]["fostering"][0]["animal"].update(breed="small"),
+               lambda animals, fosters: animals[position]["fostering"][0]["parent"].update(phone="0"),
+               lambda animals, fosters: fosters[0]["fostering"].append(fosters[0]["fostering"][0])]
+    for change in changes:
+        animals_data = json.loads(json_animals)
+        fosters_data = json.loads(json_fosters)
+        change(animals_data, fosters_data)
+        try:
+            load(json.dumps(animals_data), json.dumps(fosters_data))
+            raise AssertionError()
+        except RuntimeError:
+            pass
+
+
+def test_json_fake_records():
+    date1, date2, date3, shelter = make_test_shelterX()
+    animal = shelter.list_animals(date3)[0]
+    animal.start_foster(datetime.date(2000, 9, 6), shelter.fosters[0])
+    animal.end_foster(datetime.date(2001, 9, 5))
+    animal.start_foster(datetime.date(2004, 9, 6), shelter.fosters[0])
+    animal.end_foster(datetime.date(2005, 9, 5))
+    animal.start_foster(datetime.date(2006, 9, 6), shelter.fosters[1])
+
+    foster = load(store(shelter.fosters[0]))
+    assert len(foster.animals_in_care) == 1
+    assert len(next(iter(foster.animals_in_care)).foster_records) == 2
+
+    loaded_animal = load(store(animal))
+    parents = [record.foster for record in loaded_animal.foster_records]
+    assert parents[0] is parents[1] and parents[0] is not parents[2]
+    assert store(loaded_animal) == store(animal)
+
+
+def test_json_store_fosters():
+    date1, date2, date3, shelter = make_test_shelterX()
+    for animal in shelter.animals:
+        animal.start_foster(datetime.date(2010, 1, 1), shelter.fosters[0], True, datetime.date(2010, 2, 1))
+        animal.start_foster(datetime.date(2009, 1, 1), shelter.fosters[1], True)
+        animal.start_foster(datetime.date(2008, 1, 1), shelter.fosters[0], True, datetime.date(2008, 2, 1))
+
+    stored = store(shelter.fosters, True)
+    assert stored == [store(foster, True) for foster in shelter.fosters]
+    assert [len(foster["fostering"]) for foster in stored] == [6, 3, 0]
+    assert [record["start"] for record in stored[0]["fostering"]] == ["2008-01-01"] * 3 + ["2010-01-01"] * 3
+    # Ties on the start date follow the same animal order for every date.
+    assert [record["animal"]["name"] for record in stored[0]["fostering"][:3]] == \
+           [record["animal"]["name"] for record in stored[0]["fostering"][3:]]
+    assert "end" not in stored[1]["fostering"][0]
+
+
 def test_main_json():
     test_json_load_and_store_animal()
+    test_json_dump()
+    test_json_load_stream()
+    test_json_cross_check()
+    test_json_fake_records()
+    test_json_store_fosters()
     test_main_shelter()
     test_failXY()
 
@@ -0,0 +1,203 @@
+import array
+import io
+import json
+import os
+import tempfile
+
+import shelter_json
+from shelter import *
+
+OFFSET_TYPECODE = "Q"
+
+
+def iter_lines(objects):
+    # One JSON document per line, the same dicts shelter_json.store produces.
+    for object_value in objects:
+        if type(object_value) == Foster:
+            record = shelter_json.store_foster(object_value)
+        elif type(object_value) == Animal:
+            record = shelter_json.store_animal(object_value)
+        else:
+            raise RuntimeError("JSON Lines can store only Foster or Animal objects.")
+        yield (json.dumps(record) + "\n").encode()
+
+
+def store(objects):
+    return b"".join(iter_lines(objects))
+
+
+def dump(objects, fp, index_fp=None):
+    # Writes at the current position of a binary file, so a file opened with "ab" is appended to.
+    offsets = array.array(OFFSET_TYPECODE)
+    position = fp.tell()
+    for line in iter_lines(objects):
+        offsets.append(position)
+        fp.write(line)
+        position += len(line)
+    if index_fp is not None:
+        index_fp.write(offsets.tobytes())
+    return offsets
+
+
+def append(path, objects, index_path=None):
+    with open(path, "ab") as fp:
+        if index_path is None:
+            return dump(objects, fp)
+        with open(index_path, "ab") as index_fp:
+            return dump(objects, fp, index_fp)
+
+
+def build_index(fp):
+    fp.seek(0)
+    offsets = array.array(OFFSET_TYPECODE)
+    position = 0
+    for line in fp:
+        if line.strip():
+            offsets.append(position)
+        position += len(line)
+    return offsets
+
+
+def read_offset(index_fp, position):
+    item_size = array.array(OFFSET_TYPECODE).itemsize
+    if position < 0:
+        raise RuntimeError("Record position out of range.")
+    index_fp.seek(position * item_size)
+    data = index_fp.read(item_size)
+    if len(data) != item_size:
+        raise RuntimeError("Record position out of range.")
+    return array.array(OFFSET_TYPECODE, data)[0]
+
+
+def read_record(fp, index_fp, position):
+    fp.seek(read_offset(index_fp, position))
+    return json.loads(fp.readline())
+
+
+def iter_records(fp):
+    for line in fp:
+        if line.strip():
+            yield json.loads(line)
+
+
+def split_ranges(fp, parts):
+    # Byte ranges covering the file, every boundary is moved forward to the start of the next line.
+    try_argument(parts, int)
+    if parts < 1:
+        raise RuntimeError("Amount of parts has to be positive.")
+    size = fp.seek(0, io.SEEK_END)
+    boundaries = [0]
+    for part in range(1, parts):
+        boundary = size * part // parts
+        if boundary <= boundaries[-1]:
+            continue
+        fp.seek(boundary - 1)
+        fp.readline()
+        boundary = fp.tell()
+        if boundary > boundaries[-1] and boundary < size:
+            boundaries.append(boundary)
+    boundaries.append(size)
+    return [(start, end) for start, end in zip(boundaries, boundaries[1:])]
+
+
+def iter_range(fp, start, end):
+    # Records whose line starts inside [start, end), ranges from split_ranges never share a record.
+    fp.seek(start)
+    position = start
+    while position < end:
+        line = fp.readline()
+        if len(line) == 0:
+            break
+        position += len(line)
+        if line.strip():
+            yield json.loads(line)
+
+
+def load(animals_fp, fosters_fp):
+    return shelter_json.load_shelter_data(Shelter(), iter_records(animals_fp), iter_records(fosters_fp))
+
+
+def make_test_shelter():
+    shelter = Shelter()
+    date = datetime.date(2010, 6, 1)
+    for index in range(7):
+        shelter.add_animal('Animal ' + str(index), 2005 + index, 'male', date, 'dog', 'labrador')
+    shelter.add_foster_parent('Freddy', 'New York', '09542985248', 3)
+    shelter.add_foster_parent('Pleb', 'Sydney', '0365848585', 1)
+    shelter.animals[0].start_foster(datetime.date(2011, 1, 1), shelter.fosters[0])
+    shelter.animals[0].end_foster(datetime.date(2011, 2, 1))
+    shelter.animals[1].start_foster(datetime.date(2011, 1, 1), shelter.fosters[1])
+    shelter.animals[2].add_exam('Pro Care', datetime.date(2010, 7, 1), 'Thorough entrance exam.\nAll fine.')
+    return shelter
+
+
+def test_jsonl_store_and_load():
+    shelter = make_test_shelter()
+    animal_lines = store(shelter.animals)
+    foster_lines = store(shelter.fosters)
+    assert animal_lines.count(b"\n") == len(shelter.animals)
+    assert [json.loads(line) for line in animal_lines.splitlines()] == shelter_json.store(shelter.animals, True)
+    assert list(iter_records(io.BytesIO(foster_lines))) == shelter_json.store(shelter.fosters, True)
+
+    loaded = load(io.BytesIO(animal_lines), io.BytesIO(foster_lines))
+    assert shelter_json.store(loaded.animals) == shelter_json.store(shelter.animals)
+    assert shelter_json.store(loaded.fosters) == shelter_json.store(shelter.fosters)
+    assert store([]) == b""
+
+    try:
+        store([shelter.animals[0], 'Rex'])
+        raise AssertionError()
+    except RuntimeError:
+        pass
+
+
+def test_jsonl_append_and_index():
+    shelter = make_test_shelter()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "animals.jsonl")
+        index_path = os.path.join(directory, "animals.idx")
+        append(path, shelter.animals[:3], index_path)
+        offsets = append(path, shelter.animals[3:], index_path)
+        assert offsets[0] > 0
+
+        with open(path, "rb") as fp, open(index_path, "rb") as index_fp:
+            assert fp.read() == store(shelter.animals)
+            assert build_index(fp) == array.array(OFFSET_TYPECODE, index_fp.read())
+            for position, animal in enumerate(shelter.animals):
+                assert read_record(fp, index_fp, position) == shelter_json.store_animal(animal)
+            for position in (-1, len(shelter.animals)):
+                try:
+                    read_record(fp, index_fp, position)
+                    raise AssertionError()
+                except RuntimeError:
+                    pass
+
+
+def test_jsonl_split_ranges():
+    shelter = make_test_shelter()
+    data = store(shelter.animals)
+    fp = io.BytesIO(data)
+    for parts in range(1, 12):
+        ranges = split_ranges(fp, parts)
+        assert ranges[0][0] == 0 and ranges[-1][1] == len(data) and len(ranges) <= parts
+        assert all(previous[1] == current[0] for previous, current in zip(ranges, ranges[1:]))
+        assert all(start == 0 or data[start - 1:start] == b"\n" for start, end in ranges)
+        records = [record for start, end in ranges for record in iter_range(fp, start, end)]
+        assert records == shelter_json.store(shelter.animals, True)
+
+    assert split_ranges(io.BytesIO(b""), 3) == [(0, 0)]
+    try:
+        split_ranges(fp, 0)
+        raise AssertionError()
+    except RuntimeError:
+        pass
+
+
+def test_main_jsonl():
+    test_jsonl_store_and_load()
+    test_jsonl_append_and_index()
+    test_jsonl_split_ranges()
+
+
+if __name__ == '__main__':
+    test_main_jsonl()
@@ -66,7 +66,7 @@ def create_snapshot(db: sqlite3.Connection, shelter: Shelter) -> int:
             cursor.execute("INSERT INTO fosters VALUES (NULL, ?, ?, ?)",
                            (foster.name, foster.address, foster.phone_number,))
             foster_ID = cursor.lastrowid
-        foster.SQL_ID = foster_ID
+        shelter.set_sql_id(foster, foster_ID)
         cursor.execute("INSERT INTO snapshot_max_animals VALUES(?, ?, ?)",
                        (str(foster_ID), str(snapshot_ID), str(foster.max_animals)))
 
@@ -82,10 +82,10 @@ def create_snapshot(db: sqlite3.Connection, shelter: Shelter) -> int:
                            (animal.name, str(animal.year_of_birth), animal.gender, animal.species, animal.breed,))
             animal_ID = cursor.lastrowid
         cursor.execute("INSERT INTO snapshot_entry VALUES (?, ?, ?);",
-                       (str(animal_ID), str(snapshot_ID), str(animal.date_of_entry),))
+                       (str(animal_ID), str(snapshot_ID), format_date(animal.date_of_entry),))
         for rec in (animal.veterinary_records if animal.veterinary_records is not None else []):
             cursor.execute("INSERT INTO vet_record VALUES (?, ?, ?, ?, ?);",
-                           (str(animal_ID), str(snapshot_ID), rec.vet, str(rec.date), rec.report,))
+                           (str(animal_ID), str(snapshot_ID), rec.vet, format_date(rec.date), rec.report,))
         if animal.adopter is not None:
             cursor.execute("SELECT ID_adopter FROM adopter_human WHERE name = ? AND address = ?;",
                            (animal.adopter[0].name, animal.adopter[0].address,))
@@ -97,12 +97,12 @@ def create_snapshot(db: sqlite3.Connection, shelter: Shelter) -> int:
                                (animal.adopter[0].name, animal.adopter[0].address,))
                 adopter_id = cursor.lastrowid
             cursor.execute("INSERT INTO adopter VALUES(?, ?, ?, ?);",
-                           (str(animal_ID), str(snapshot_ID), str(adopter_id), animal.adopter[1]))
+                           (str(animal_ID), str(snapshot_ID), str(adopter_id), format_date(animal.adopter[1])))
         for rec in (animal.foster_records if animal.foster_records is not None else []):
             cursor.execute("INSERT INTO foster_record VALUES (?, ?, ?, ?, ?);",
                            (str(rec.foster.SQL_ID), str(animal_ID), str(snapshot_ID),
-                            str(rec.period_from),
-                            (str(rec.period_to) if rec.period_to is not None else "NULL"),))
+                            format_date(rec.period_from),
+                            (format_date(rec.period_to) if rec.period_to is not None else "NULL"),))
     db.commit()
     return snapshot_ID
 
@@ -139,7 +139,7 @@ def try_match_vet_records(animal: Animal, snapshot_id: int, animal_id: int, curs
         found_record = None
         for record_index in range(len(shelter_records)):
             if shelter_records[record_index].vet == record_sql[2] and \
-                    str(shelter_records[record_index].date) == record_sql[3] and \
+                    format_date(shelter_records[record_index].date) == record_sql[3] and \
                     shelter_records[record_index].report == record_sql[4]:
                 found_record = record_index
                 break
@@ -162,7 +162,8 @@ def try_match_adopter_records(animal: Animal, snapshot_id: int, animal_id: int,
 
     animal_adopter_data = cursor.fetchone()
 
-    return (str(animal.adopter[1]) == animal_adoption_result[0][3] and animal_adopter_data[1] == animal.adopter[0].name
+    return (format_date(animal.adopter[1]) == animal_adoption_result[0][3]
+            and animal_adopter_data[1] == animal.adopter[0].name
             and animal.adopter[0].address == animal_adopter_data[2])
 
 
@@ -177,7 +178,7 @@ def try_associate_animals_ID(shelter: Shelter, snapshot_id: int, cursor: sqlite3
         if problem_found:
             return False
         for shelter_animal in shelter.animals:
-            if str(shelter_animal.date_of_entry) != date:
+            if format_date(shelter_animal.date_of_entry) != date:
                 continue
 
             cursor.execute("SELECT * FROM animals WHERE ID_animal = ?;", (str(animal_ID),))
@@ -186,7 +187,7 @@ def try_associate_animals_ID(shelter: Shelter, snapshot_id: int, cursor: sqlite3
                 if not try_match_vet_records(shelter_animal, snapshot_id, animal_ID, cursor) or \
                         not try_match_adopter_records(shelter_animal, snapshot_id, animal_ID, cursor):
                     continue
-                shelter_animal.SQL_ID = animal_ID
+                shelter.set_sql_id(shelter_animal, animal_ID)
                 break
         else:
             problem_found = True
@@ -210,7 +211,7 @@ def try_associate_fosters_ID(shelter: Shelter, snapshot_id: int, cursor: sqlite3
 
             cursor.execute("SELECT * FROM fosters WHERE ID_foster = ?;", (str(foster_ID),))
             if shelter_foster.compare_foster_with_sql(cursor.fetchone()):
-                shelter_foster.SQL_ID = foster_ID
+                shelter.set_sql_id(shelter_foster, foster_ID)
                 break
         else:
             problem_found = True
@@ -234,11 +235,11 @@ def try_associate_foster_records(shelter: Shelter, snapshot_id: int, cursor: sql
             found_record = None
             for record_index in range(len(shelter_records)):
                 if shelter_records[record_index].foster.SQL_ID == record_sql[0] and \
-                        str(shelter_records[record_index].period_from) == record_sql[3]:
+                        format_date(shelter_records[record_index].period_from) == record_sql[3]:
                     if (shelter_records[record_index].period_to is None and
                         (record_sql[4] == "NULL" or record_sql[4] is None)) or \
                             (shelter_records[record_index].period_to is not None
-                             and str(shelter_records[record_index].period_to) == record_sql[4]):
+                             and format_date(shelter_records[record_index].period_to) == record_sql[4]):
                         found_record = record_index
                         break
             if found_record is None:
@@ -270,22 +271,29 @@ def load(id, db: sqlite3.Connection) -> Shelter:
     shelter = Shelter()
     cursor = db.cursor()
     cursor.execute("SELECT ID_foster, max_animals FROM snapshot_max_animals WHERE ID_snapshot = ?;", (str(id),))
+    foster_rows = []
     for (foster_id, max_animals,) in cursor.fetchall():
         cursor.execute("SELECT * FROM fosters WHERE ID_foster = ?;", (str(foster_id),))
         foster_data = cursor.fetchone()
-        shelter.add_foster_parent(foster_data[1], foster_data[2], foster_data[3], max_animals, foster_id)
+        foster_rows.append((foster_data[1], foster_data[2], foster_data[3], max_animals, foster_id))
+    shelter.add_foster_parents_bulk(foster_rows)
+
     cursor.execute("SELECT ID_animal, date_of_entry FROM snapshot_entry WHERE ID_snapshot = ?;", (str(id),))
+    animal_ids = []
+    animal_rows = []
     for (animal_id, entry_date,) in cursor.fetchall():
         cursor.execute("SELECT * FROM animals WHERE ID_animal = ?;", (animal_id,))
         animal_data = cursor.fetchone()
-        animal_obj = shelter.add_animal(
-            animal_data[1], animal_data[2], animal_data[3],
-            datetime.date.fromisoformat(entry_date), animal_data[4], animal_data[5])
-        animal_obj.SQL_ID = animal_id
+        animal_ids.append(animal_id)
+        animal_rows.append((animal_data[1], animal_data[2], animal_data[3],
+                            parse_date(entry_date), animal_data[4], animal_data[5]))
+
+    for animal_id, animal_obj in zip(animal_ids, shelter.add_animals(animal_rows)):
+        shelter.set_sql_id(animal_obj, animal_id)
 
         cursor.execute("SELECT * FROM vet_record WHERE ID_animal = ? AND ID_snapshot = ?;", (str(animal_id), str(id),))
         for rec in cursor.fetchall():
-            animal_obj.add_exam(rec[2], datetime.date.fromisoformat(rec[3]), rec[4])
+            animal_obj.add_exam(rec[2], parse_date(rec[3]), rec[4])
 
         cursor.execute("SELECT * FROM foster_record WHERE ID_animal = ? AND ID_snapshot = ?;",
                        (str(animal_id), str(id),))
@@ -295,17 +303,17 @@ def load(id, db: sqlite3.Connection) -> Shelter:
                 raise RuntimeError("Integrity err.")
 
             if rec[4] != "NULL" and rec[4] is not None:
-                animal_obj.start_foster(datetime.date.fromisoformat(rec[3]), foster, True,
-                                        datetime.date.fromisoformat(rec[4]))
+                animal_obj.start_foster(parse_date(rec[3]), foster, True,
+                                        parse_date(rec[4]))
             else:
-                animal_obj.start_foster(datetime.date.fromisoformat(rec[3]), foster, True)
+                animal_obj.start_foster(parse_date(rec[3]), foster, True)
 
         cursor.execute("SELECT * FROM adopter WHERE ID_animal = ? AND ID_snapshot = ?;", (str(animal_id), str(id),))
         adopt_result = cursor.fetchall()
         if len(adopt_result) == 1:
             cursor.execute("SELECT * FROM adopter_human WHERE ID_adopter = ?;", (adopt_result[0][2],))
             adopter_data = cursor.fetchone()
-            animal_obj.adopt(datetime.date.fromisoformat(adopt_result[0][3]), adopter_data[1], adopter_data[2])
+            animal_obj.adopt(parse_date(adopt_result[0][3]), adopter_data[1], adopter_data[2])
     return shelter
 
 